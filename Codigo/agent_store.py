@@ -0,0 +1,129 @@
+"""Almacén de agentes en disco, memory-mapped, con recorrido por trozos.
+
+Un almacén es un directorio con un .npy por columna de la tabla compacta
+(ver agents.py) y un meta.json. Se escribe generando los agentes por trozos
+y se lee con memory-map, así que la población puede ser mayor que la RAM:
+los análisis recorren bloques de columnas con memoria O(chunk_size).
+
+Las funciones de recorrido aceptan cualquier tabla compacta, en memoria
+(load_data()['discrete']['agents']) o abierta con open_store.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import agents as agent_table
+from load_data import generate_agents, iter_agent_chunks
+
+
+# Filas por trozo (múltiplo de 8 para cortar los booleanos por bytes)
+CHUNK_SIZE = 1 << 22
+
+
+def _aligned(chunk_size):
+    return max(8, chunk_size - chunk_size % 8)
+
+
+def _column_size(group, n):
+    return -(-n // 8) if group == 'flags' else n
+
+
+def _write(path, n, chunks, meta, schema):
+    """Escribe tablas compactas sucesivas en memmaps de n filas.
+
+    Las columnas y sus tipos salen de `schema` (una tabla compacta, puede
+    estar vacía), así que con n = 0 el almacén igual tiene todas.
+    """
+    os.makedirs(path, exist_ok=True)
+    columns = {}
+    for group in ('codes', 'flags', 'values'):
+        for name, values in schema[group].items():
+            columns[name] = np.lib.format.open_memmap(
+                os.path.join(path, f'{name}.npy'), mode='w+', dtype=values.dtype,
+                shape=(_column_size(group, n),))
+    start = 0
+    for chunk in chunks:
+        for group in ('codes', 'flags', 'values'):
+            offset = start // 8 if group == 'flags' else start
+            for name, values in chunk[group].items():
+                columns[name][offset:offset + len(values)] = values
+        start += chunk['n']
+
+    for values in columns.values():
+        values.flush()
+    meta = dict(meta, n=n, columns=sorted(columns))
+    # meta.json se escribe al final: su presencia marca el almacén completo
+    with open(os.path.join(path, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    return open_store(path)
+
+
+def create(path, n_agents, kind='discrete', seed=42, chunk_size=CHUNK_SIZE):
+    """Genera n_agents directamente en disco, trozo a trozo.
+
+    El resultado es idéntico a generate_agents con la misma semilla.
+    """
+    chunks = iter_agent_chunks(n_agents, kind, seed, _aligned(chunk_size))
+    schema = agent_table.pack(generate_agents(0, kind, seed))
+    return _write(path, n_agents, map(agent_table.pack, chunks), {'kind': kind, 'seed': seed}, schema)
+
+
+def save(table, path, chunk_size=CHUNK_SIZE):
+    """Guarda una tabla compacta (o un DataFrame de agentes) como almacén"""
+    if isinstance(table, pd.DataFrame):
+        table = agent_table.from_frame(table)
+    chunk_size = _aligned(chunk_size)
+    chunks = (_slice(table, start, min(start + chunk_size, table['n']))
+              for start in range(0, table['n'], chunk_size))
+    return _write(path, table['n'], chunks, {}, table)
+
+
+def open_store(path, mode='r'):
+    """Tabla compacta con las columnas memory-mapped desde el almacén"""
+    with open(os.path.join(path, 'meta.json')) as f:
+        meta = json.load(f)
+    columns = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mode) for name in meta['columns']}
+    table = agent_table.from_packed(columns)
+    table['n'] = meta['n']
+    return table
+
+
+def _slice(table, start, stop, columns=None):
+    """Filas [start, stop) sin desempaquetar (start múltiplo de 8)"""
+    def keep(group):
+        return {k: v for k, v in table[group].items() if columns is None or k in columns}
+    return {'n': stop - start,
+            'codes': {k: v[start:stop] for k, v in keep('codes').items()},
+            'flags': {k: v[start // 8:-(-stop // 8)] for k, v in keep('flags').items()},
+            'values': {k: v[start:stop] for k, v in keep('values').items()}}
+
+
+def iter_chunks(table, chunk_size=CHUNK_SIZE, columns=None):
+    """Recorre la tabla en trozos {columna: códigos / bool / float32}.
+
+    Solo se lee de disco el trozo actual de las columnas pedidas; los trozos
+    sirven directamente para rates.attack_rates.
+    """
+    chunk_size = _aligned(chunk_size)
+    n = table['n']
+    for start in range(0, n, chunk_size):
+        yield agent_table.unpack(_slice(table, start, min(start + chunk_size, n), columns))
+
+
+def value_counts(table, name, chunk_size=CHUNK_SIZE):
+    """Como Series.value_counts de una columna categórica o booleana, por trozos"""
+    if name in table['codes']:
+        labels = agent_table.LABELS[name]
+        counts = np.zeros(len(labels), dtype=np.int64)
+        for chunk in iter_chunks(table, chunk_size, columns=(name,)):
+            counts += np.bincount(chunk[name], minlength=len(labels))
+    elif name in table['flags']:
+        labels = (False, True)
+        ones = sum(int(chunk[name].sum()) for chunk in iter_chunks(table, chunk_size, columns=(name,)))
+        counts = np.array([table['n'] - ones, ones])
+    else:
+        raise KeyError(f"'{name}' no es una columna categórica ni booleana")
+    series = pd.Series(counts, index=pd.Index(list(labels), name=name), name='count')
+    return series.sort_values(ascending=False, kind='stable')
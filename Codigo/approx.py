@@ -0,0 +1,213 @@
+"""Estadísticas aproximadas de rasgos sobre una muestra, con cotas de error.
+
+Para poblaciones enormes (10^9 agentes) no hace falta el conteo exacto de
+value_counts ni de attack_rates: una muestra uniforme de m agentes da
+proporciones con error ~ z * sqrt(p (1 - p) / m), sin importar n. El
+tamaño de muestra sale del error buscado (sample_size), así que el tiempo
+se cambia por precisión.
+
+La muestra se toma de dos formas:
+- tabla compacta (en memoria o de agent_store): posiciones al azar leídas
+  directamente del memory-map, sin recorrer la tabla; cuesta O(m);
+- iterable de trozos (p. ej. iter_agent_chunks) o DataFrame: reservorio
+  bottom-k en una pasada. Cada agente recibe una clave aleatoria y quedan
+  los m de clave menor, con O(m + trozo) de memoria.
+
+La muestra es otra tabla compacta, así que attack_rates, bootstrap y las
+pruebas de permutación corren sobre ella sin cambios. Las proporciones
+llevan intervalos de Wilson y los riesgos relativos intervalos de Katz (log
+RR). Ambos usan la corrección por población finita.
+"""
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+
+import agents as agent_table
+from agent_store import CHUNK_SIZE, iter_chunks
+from rates import attack_rates
+
+
+TARGET_ERROR = 0.01  # Semiancho del intervalo de una proporción de toda la población
+CONFIDENCE = 0.95
+
+
+def _z(confidence):
+    return NormalDist().inv_cdf((1 + confidence) / 2)
+
+
+def sample_size(target_error=TARGET_ERROR, confidence=CONFIDENCE, population=None):
+    """Agentes a muestrear para que toda proporción tenga semiancho <= target_error.
+
+    Usa el peor caso p = 0.5 y, si se da la población, la corrección por
+    población finita. Las tasas de un grupo de fracción f tienen un error
+    ~ target_error / sqrt(f).
+    """
+    m = int(np.ceil(_z(confidence) ** 2 / (4 * target_error ** 2)))
+    if population is not None:
+        m = int(np.ceil(m / (1 + (m - 1) / population)))
+        m = min(m, population)
+    return m
+
+
+def _take(table, index):
+    """Filas `index` (ordenadas) de una tabla compacta, como columnas desempaquetadas"""
+    columns = {name: np.asarray(values[index]) for name, values in table['codes'].items()}
+    for name, packed in table['flags'].items():
+        # np.packbits guarda el primer agente en el bit más alto de cada byte
+        columns[name] = ((np.asarray(packed[index >> 3]) >> (7 - (index & 7))) & 1).astype(bool)
+    columns.update({name: np.asarray(values[index]) for name, values in table['values'].items()})
+    return columns
+
+
+def _reservoir(chunks, n_sample, rng):
+    """Bottom-k: los n_sample agentes de menor clave aleatoria, en una pasada"""
+    keys, kept, population = np.empty(0), None, 0
+    for chunk in chunks:
+        size = len(next(iter(chunk.values())))
+        population += size
+        chunk_keys = rng.random(size)
+        if kept is None:
+            kept = {name: np.asarray(values)[:0] for name, values in chunk.items()}
+        # Solo pueden entrar los de clave menor que la mayor del reservorio lleno
+        if len(keys) == n_sample:
+            candidates = np.flatnonzero(chunk_keys < keys.max())
+        else:
+            candidates = np.arange(size)
+        keys = np.concatenate((keys, chunk_keys[candidates]))
+        kept = {name: np.concatenate((kept[name], np.asarray(chunk[name])[candidates])) for name in kept}
+        if len(keys) > n_sample:
+            best = np.argpartition(keys, n_sample - 1)[:n_sample]
+            keys = keys[best]
+            kept = {name: values[best] for name, values in kept.items()}
+    return kept, population
+
+
+def sample_agents(source, n_sample, seed=123, chunk_size=CHUNK_SIZE):
+    """Muestra uniforme sin reposición de n_sample agentes.
+
+    source: tabla compacta, DataFrame de agentes o iterable de trozos de
+        columnas (como iter_agent_chunks).
+    Devuelve (tabla compacta de la muestra, agentes de la población).
+    """
+    rng = np.random.default_rng(seed)
+    if isinstance(source, pd.DataFrame):
+        source = agent_table.from_frame(source)
+    if isinstance(source, dict) and 'codes' in source:
+        n = source['n']
+        if n_sample >= n:
+            return source, n
+        index = np.sort(rng.choice(n, n_sample, replace=False))
+        return agent_table.pack(_take(source, index)), n
+    columns, n = _reservoir(iter(source), n_sample, rng)
+    return agent_table.pack(columns), n
+
+
+def wilson(successes, trials, confidence=CONFIDENCE, fpc=1.0):
+    """Intervalo de Wilson (bajo, alto) de successes/trials, con corrección finita fpc"""
+    successes = np.asarray(successes, dtype=float)
+    trials = np.maximum(np.asarray(trials, dtype=float), 1)
+    z2 = _z(confidence) ** 2 * fpc
+    p = successes / trials
+    center = (p + z2 / (2 * trials)) / (1 + z2 / trials)
+    half = np.sqrt(z2 * p * (1 - p) / trials + z2 ** 2 / (4 * trials ** 2)) / (1 + z2 / trials)
+    return np.stack((np.clip(center - half, 0, 1), np.clip(center + half, 0, 1)), axis=-1)
+
+
+def _fpc(sample, population):
+    return (population - sample) / max(population - 1, 1)
+
+
+def distribution(sample, name, population, confidence=CONFIDENCE):
+    """Proporción de cada grupo de un rasgo en la población, estimada de la muestra.
+
+    Devuelve {'labels', 'share', 'interval' (G, 2), 'count'}, con count =
+    agentes estimados en la población (como value_counts).
+    """
+    m = sample['n']
+    if name in sample['codes']:
+        labels = agent_table.LABELS[name]
+        counts = np.bincount(sample['codes'][name], minlength=len(labels))
+    else:
+        labels = (False, True)
+        ones = int(agent_table.flag(sample, name).sum())
+        counts = np.array([m - ones, ones])
+    share = counts / m
+    return {'labels': labels, 'share': share, 'interval': wilson(counts, m, confidence, _fpc(m, population)),
+            'count': np.rint(share * population).astype(np.int64)}
+
+
+def relative_risk_bounds(rates, trait, reference, confidence=CONFIDENCE, fpc=1.0):
+    """RR de cada grupo frente a `reference` e intervalo de Katz (G, 2)"""
+    group = rates['by_trait'][trait]
+    ref = list(group['labels']).index(reference)
+    count = group['count'].astype(float)
+    infected = group['infected'].astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rr = group['rate'] / group['rate'][ref]
+        se = np.sqrt((1 / infected - 1 / count + 1 / infected[ref] - 1 / count[ref]) * fpc)
+        intervals = rr[:, None] * np.exp(np.outer(se, [-_z(confidence), _z(confidence)]))
+    intervals[ref] = 1.0
+    return rr, intervals
+
+
+def relative_risk_intervals(approx, references=None):
+    """RR por grupo de cada rasgo de la muestra, con intervalos de Katz y corrección finita.
+
+    approx: resultado de approximate. references: {rasgo: grupo de
+    referencia} (por defecto los de bootstrap.REFERENCES).
+    Devuelve {rasgo: {'labels', 'reference', 'rr', 'katz'}}, como
+    bootstrap.relative_risk_intervals.
+    """
+    from bootstrap import REFERENCES
+
+    references = dict(REFERENCES, **(references or {}))
+    rates = approx['rates']
+    results = {}
+    for trait in rates['traits']:
+        rr, intervals = relative_risk_bounds(rates, trait, references[trait], approx['confidence'], approx['fpc'])
+        results[trait] = {'labels': rates['labels'][trait], 'reference': references[trait], 'rr': rr,
+                          'katz': intervals}
+    return results
+
+
+def approximate(agents, target_error=TARGET_ERROR, confidence=CONFIDENCE, seed=123, n_sample=None,
+                chunk_size=CHUNK_SIZE):
+    """Distribuciones, tasas de ataque y sus cotas a partir de una muestra.
+
+    agents: tabla compacta, DataFrame o iterable de trozos (ver sample_agents).
+    n_sample: tamaño de muestra (por defecto, el de target_error).
+
+    Devuelve un dict con:
+        sample: tabla compacta de la muestra (sirve para attack_rates,
+            bootstrap y permutaciones).
+        population, sample_size, target_error, confidence.
+        distributions: {rasgo: distribution(...)} para edad, vacunación y
+            ocupación (si está).
+        rates: attack_rates de la muestra. Cada by_trait[rasgo] y total
+            llevan además 'interval', el intervalo de Wilson de la tasa.
+    """
+    population = agents['n'] if isinstance(agents, dict) and 'n' in agents else (
+        len(agents) if isinstance(agents, pd.DataFrame) else None)
+    if n_sample is None:
+        n_sample = sample_size(target_error, confidence, population)
+    sample, population = sample_agents(agents, n_sample, seed, chunk_size)
+    fpc = _fpc(sample['n'], population)
+
+    rates = attack_rates(iter_chunks(sample, chunk_size))
+    for group in rates['by_trait'].values():
+        group['interval'] = wilson(group['infected'], group['count'], confidence, fpc)
+    total = rates['total']
+    total['interval'] = tuple(wilson(total['infected'], total['count'], confidence, fpc))
+
+    names = [name for name in ('age', 'vaccinated', 'occupation') if name in sample['codes'] or name in sample['flags']]
+    return {
+        'sample': sample,
+        'population': population,
+        'sample_size': sample['n'],
+        'target_error': target_error,
+        'confidence': confidence,
+        'fpc': fpc,
+        'distributions': {name: distribution(sample, name, population, confidence) for name in names},
+        'rates': rates,
+    }
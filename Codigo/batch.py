@@ -0,0 +1,224 @@
+"""Análisis por lotes de muchos escenarios guardados en un directorio.
+
+Un escenario es una entrada con el formato de la caché de load_data (un
+directorio con meta.json y un .npy por columna, ver cache.py). Por ejemplo,
+load_data(seed=s, cache_dir=DIR) deja uno por semilla en DIR. Cada
+escenario pasa por las pruebas de parte_2 a parte_4. Sus veredictos van a
+una fila de una tabla CSV común.
+
+Los escenarios corren en un pool acotado de procesos. Cada worker carga su
+escenario (memory-map) mientras los demás calculan, y nunca hay más de
+2 * workers escenarios en vuelo. Con un solo worker, un hilo precarga el
+escenario siguiente mientras se analiza el actual. Cada fila se escribe
+(y se sincroniza a disco) apenas termina su escenario. Así una caída no
+pierde lo terminado: al volver a correr se saltean los escenarios que ya
+tienen fila sin error.
+
+Uso: python batch.py DIRECTORIO [--out tabla.csv] [--logs DIR] [--workers N]
+                     [--permutations N] [--bootstrap N]
+"""
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import numpy as np
+
+import cache as data_cache
+from load_data import _to_output
+
+
+# Columnas de la tabla comparativa
+COLUMNS = (
+    'scenario',
+    'discrete_periodicity', 'continuous_periodicity',
+    'discrete_small_transmission', 'continuous_small_transmission',
+    'discrete_windows', 'continuous_windows',
+    'discrete_effects', 'continuous_effects',
+    'discrete_rr_unvaccinated', 'continuous_rr_unvaccinated',
+    'seconds', 'error',
+)
+DATASETS = (('discrete', "DATOS DISCRETOS"), ('continuous', "DATOS CONTINUOS"))
+
+
+def discover(root):
+    """Escenarios bajo root (directorios con el meta.json de la caché), ordenados"""
+    found = []
+    for path, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        if 'meta.json' not in files:
+            continue
+        try:
+            with open(os.path.join(path, 'meta.json')) as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if {'discrete', 'continuous'} <= set(meta.get('datasets', ())):
+            found.append(path)
+    return found
+
+
+def load_scenario(path, in_memory=False):
+    """Datasets de un escenario como los de load_data (memory-mapped por defecto)"""
+    path = os.path.normpath(path)
+    datasets = data_cache.load(os.path.basename(path), os.path.dirname(path))
+    if datasets is None:
+        raise ValueError(f"{path}: no es un escenario válido (o es de otra versión del formato)")
+    if in_memory:
+        datasets = {name: {k: v if isinstance(v, list) else np.array(v) for k, v in columns.items()}
+                    for name, columns in datasets.items()}
+    return {name: _to_output(columns) for name, columns in datasets.items()}
+
+
+def analyze_scenario(data, n_permutations=1000, n_bootstrap=2000):
+    """Veredictos de parte_2 a parte_4 de un escenario (una fila sin 'scenario')"""
+    from parte_2 import analyze_between_peaks, analyze_periodicity
+    from parte_3 import calc_simple_rr, simulate_simple_rates
+    from parte_4 import test_temporal_windows, test_trait_shuffling
+    from resample import to_daily
+
+    row = {}
+    for key, label in DATASETS:
+        times, infections = data[key]['series']
+        row[f'{key}_periodicity'], _ = analyze_periodicity(times, infections, label)
+        row[f'{key}_small_transmission'] = analyze_between_peaks(infections, label)
+
+        rates = simulate_simple_rates(data[key]['agents'], label)
+        intervals = calc_simple_rr(rates, label, n_bootstrap)['vaccinated']
+        unvaccinated = list(intervals['labels']).index(False)
+        low, high = intervals['bca'][unvaccinated]
+        row[f'{key}_rr_unvaccinated'] = f"{intervals['rr'][unvaccinated]:.2f} ({low:.2f}-{high:.2f})"
+
+        row[f'{key}_windows'], _ = test_temporal_windows(*to_daily(times, infections), label)
+        row[f'{key}_effects'], _ = test_trait_shuffling(data[key]['agents'], label, n_permutations)
+    return row
+
+
+def _name(path, root):
+    return os.path.relpath(path, root)
+
+
+def _run(path, root, data=None, log_dir=None, **options):
+    """Fila de un escenario; los errores quedan en la columna 'error'"""
+    start = time.perf_counter()
+    row = {'scenario': _name(path, root)}
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            row.update(analyze_scenario(data if data is not None else load_scenario(path), **options))
+    except Exception as e:
+        row['error'] = f"{type(e).__name__}: {e}"
+    row['seconds'] = f"{time.perf_counter() - start:.2f}"
+    if log_dir:
+        log = os.path.join(log_dir, row['scenario'].replace(os.sep, '__') + '.txt')
+        with open(log, 'w') as f:
+            f.write(output.getvalue())
+    return row
+
+
+def finished(table_path):
+    """Escenarios que ya tienen una fila sin error en la tabla"""
+    try:
+        with open(table_path, newline='') as f:
+            return {row['scenario'] for row in csv.DictReader(f) if not row.get('error')}
+    except (OSError, KeyError):
+        return set()
+
+
+class _Table:
+    """Tabla CSV que se agranda fila por fila (cada fila queda en disco al escribirla)"""
+
+    def __init__(self, path):
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='')
+        self.writer = csv.DictWriter(self.file, COLUMNS, extrasaction='ignore')
+        if new:
+            self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+def _prefetched(paths):
+    """(ruta, datos) con la carga del siguiente escenario en un hilo aparte"""
+    with ThreadPoolExecutor(max_workers=1) as loader:
+        pending = loader.submit(load_scenario, paths[0], True) if paths else None
+        for k, path in enumerate(paths):
+            try:
+                data = pending.result()
+            except Exception:
+                data = None  # El error se repite (y se registra) al analizar
+            if k + 1 < len(paths):
+                pending = loader.submit(load_scenario, paths[k + 1], True)
+            yield path, data
+
+
+def run_batch(root, table_path='escenarios.csv', workers=None, log_dir=None, n_permutations=1000,
+              n_bootstrap=2000):
+    """Analiza todos los escenarios de root que aún no están en la tabla.
+
+    Devuelve las filas nuevas en el orden en que terminaron.
+    """
+    options = {'log_dir': log_dir, 'n_permutations': n_permutations, 'n_bootstrap': n_bootstrap}
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+    done = finished(table_path)
+    paths = [path for path in discover(root) if _name(path, root) not in done]
+    workers = workers or os.cpu_count() or 1
+
+    rows = []
+    table = _Table(table_path)
+    try:
+        if workers == 1:
+            for path, data in _prefetched(paths):
+                rows.append(_run(path, root, data, **options))
+                table.write(rows[-1])
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                queue = iter(paths)
+                in_flight = set()
+                while True:
+                    # Ventana acotada: se envía un escenario nuevo por cada uno que termina
+                    for path in queue:
+                        in_flight.add(pool.submit(_run, path, root, **options))
+                        if len(in_flight) >= 2 * workers:
+                            break
+                    if not in_flight:
+                        break
+                    finished_now, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished_now:
+                        rows.append(future.result())
+                        table.write(rows[-1])
+    finally:
+        table.close()
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analiza todos los escenarios de un directorio")
+    parser.add_argument('root', help="directorio con escenarios (entradas con el formato de la caché)")
+    parser.add_argument('--out', default='escenarios.csv', help="tabla comparativa (se agranda si ya existe)")
+    parser.add_argument('--logs', default=None, help="directorio para la salida completa de cada escenario")
+    parser.add_argument('--workers', type=int, default=None, help="procesos de análisis")
+    parser.add_argument('--permutations', type=int, default=1000, help="permutaciones por prueba de rasgos")
+    parser.add_argument('--bootstrap', type=int, default=2000, help="réplicas bootstrap por riesgo relativo")
+    args = parser.parse_args(argv)
+
+    rows = run_batch(args.root, args.out, args.workers, args.logs, args.permutations, args.bootstrap)
+    failed = [row for row in rows if row.get('error')]
+    print(f"{len(rows)} escenarios analizados ({len(failed)} con error) -> {args.out}")
+    for row in failed:
+        print(f"  {row['scenario']}: {row['error']}")
+
+
+if __name__ == "__main__":
+    main()
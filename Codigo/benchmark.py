@@ -0,0 +1,244 @@
+"""Benchmarks de los caminos críticos del análisis para distintos tamaños.
+
+Cada caso (función x tamaño) corre en un proceso nuevo, así el pico de
+memoria (RSS) es el del caso y no se mezcla con los anteriores. La
+preparación de entradas (generar la serie o los agentes) no se cuenta en el
+tiempo, salvo en load_data, que es lo que se mide.
+
+Los resultados se guardan en JSON y se comparan con una línea base: un caso
+es regresión si su tiempo o su memoria superan a los de la base en más de
+`--tolerance`. Con regresiones el programa termina con código 1. La base
+del repo (benchmarks/baseline.json) es la de `--repeat 3 --save-baseline`
+en la máquina que figura en su campo 'machine'; en otra máquina conviene
+regenerarla antes de comparar.
+
+Uso:
+    python benchmark.py                          # todos los casos, 10^3..10^6
+    python benchmark.py --max-size 1e8 --cases find_peaks
+    python benchmark.py --save-baseline          # guardar como línea base
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'results.json')
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'baseline.json')
+SIZES = [10 ** k for k in range(3, 9)]
+DEFAULT_MAX_SIZE = 10 ** 6
+TOLERANCE = 0.25
+TIMEOUT = 1800
+
+
+def _series(n):
+    from load_data import generate_series
+    return generate_series(n_samples=n)
+
+
+def _agents(n):
+    import agents
+    from load_data import generate_agents
+    return agents.pack(generate_agents(n, 'discrete'))
+
+
+def _quiet(func, *args, **kwargs):
+    """Llama a func sin su salida por pantalla (los análisis imprimen reportes)"""
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        return func(*args, **kwargs)
+
+
+def _setup_load_data(n):
+    from load_data import load_data
+    return lambda: load_data(n_agents=n, n_samples=n, cache=False)
+
+
+def _setup_find_peaks(n):
+    from parte_2 import find_peaks
+    times, infections = _series(n)
+    return lambda: find_peaks(infections, times=times)
+
+
+def _setup_analyze_between_peaks(n):
+    from parte_2 import analyze_between_peaks
+    _, infections = _series(n)
+    return lambda: _quiet(analyze_between_peaks, infections, "BENCHMARK")
+
+
+def _setup_simulate_simple_rates(n):
+    from parte_3 import simulate_simple_rates
+    table = _agents(n)
+    return lambda: _quiet(simulate_simple_rates, table, "BENCHMARK")
+
+
+def _setup_test_temporal_windows(n):
+    from parte_4 import test_temporal_windows
+    times, infections = _series(n)
+    return lambda: _quiet(test_temporal_windows, times, infections, "BENCHMARK")
+
+
+def _setup_test_trait_shuffling(n):
+    from parte_4 import test_trait_shuffling
+    table = _agents(n)
+    return lambda: _quiet(test_trait_shuffling, table, "BENCHMARK")
+
+
+# Caso -> función que prepara las entradas para n y devuelve lo que se mide
+CASES = {
+    'load_data': _setup_load_data,
+    'find_peaks': _setup_find_peaks,
+    'analyze_between_peaks': _setup_analyze_between_peaks,
+    'simulate_simple_rates': _setup_simulate_simple_rates,
+    'test_temporal_windows': _setup_test_temporal_windows,
+    'test_trait_shuffling': _setup_test_trait_shuffling,
+}
+
+
+def _reset_peak_rss():
+    """Reinicia el pico de RSS (Linux); devuelve False si no se puede"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _peak_rss(since_reset):
+    """Pico de RSS en bytes: VmHWM desde el reinicio, o ru_maxrss de todo el proceso"""
+    if since_reset:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _child(case, n, repeat):
+    """Corre un caso en este proceso e imprime el resultado como JSON.
+
+    El pico de RSS se mide solo durante lo medido (sin la preparación)
+    cuando el sistema permite reiniciarlo. La memoización se apaga: con
+    varias repeticiones, la mínima sería la de una lectura del caché.
+    """
+    import memo
+    memo.enable(False)
+    func = CASES[case](n)
+    since_reset = _reset_peak_rss()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    wall = min(times)
+    print(json.dumps({'wall_s': wall, 'peak_rss_bytes': _peak_rss(since_reset),
+                      'throughput_per_s': n / wall if wall > 0 else None}))
+
+
+def run_case(case, n, repeat=1, timeout=TIMEOUT):
+    """Corre un caso en un proceso nuevo; devuelve su registro de resultados"""
+    record = {'case': case, 'size': n}
+    cmd = [sys.executable, os.path.abspath(__file__), '--child', case, str(n), str(repeat)]
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout,
+                              cwd=os.path.dirname(os.path.abspath(__file__)))
+    except subprocess.TimeoutExpired:
+        return dict(record, status='timeout')
+    if proc.returncode != 0:
+        # -9: el sistema mató el proceso (normalmente por falta de memoria)
+        error = proc.stderr.strip().splitlines()[-1:] or [f'código {proc.returncode}']
+        return dict(record, status='error', returncode=proc.returncode, error=error[0])
+    return dict(record, status='ok', **json.loads(proc.stdout.strip().splitlines()[-1]))
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """Marca en cada resultado si empeoró respecto de la línea base"""
+    base = {(r['case'], r['size']): r for r in baseline.get('results', [])}
+    regressions = []
+    for record in results:
+        ref = base.get((record['case'], record['size']))
+        if ref is None or ref.get('status') != 'ok':
+            continue
+        if record['status'] != 'ok':
+            record['regression'] = [record['status']]
+        else:
+            record['regression'] = [metric for metric in ('wall_s', 'peak_rss_bytes')
+                                    if record[metric] > ref[metric] * (1 + tolerance)]
+            record['vs_baseline'] = {metric: record[metric] / ref[metric] for metric in ('wall_s', 'peak_rss_bytes')}
+        if record['regression']:
+            regressions.append(record)
+    return regressions
+
+
+def _machine():
+    return {'python': platform.python_version(), 'numpy': np.__version__, 'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+
+def _format(record):
+    if record['status'] != 'ok':
+        return f"{record['case']:<24} {record['size']:>11,} {record['status']}"
+    line = (f"{record['case']:<24} {record['size']:>11,} {record['wall_s']:>10.3f} s "
+            f"{record['peak_rss_bytes'] / 2 ** 20:>9.1f} MiB {record['throughput_per_s']:>14,.0f} /s")
+    if record.get('regression'):
+        line += f"  REGRESIÓN ({', '.join(record['regression'])})"
+    return line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los análisis para distintos tamaños")
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--sizes', nargs='+', type=float, default=None, help="tamaños (por defecto 10^3..--max-size)")
+    parser.add_argument('--max-size', type=float, default=DEFAULT_MAX_SIZE)
+    parser.add_argument('--repeat', type=int, default=1, help="repeticiones por caso (se guarda la mínima)")
+    parser.add_argument('--timeout', type=float, default=TIMEOUT, help="segundos máximos por caso")
+    parser.add_argument('--output', default=RESULTS_PATH)
+    parser.add_argument('--baseline', default=BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE)
+    parser.add_argument('--save-baseline', action='store_true', help="guardar los resultados como línea base")
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        case, n, repeat = args.child
+        _child(case, int(n), int(repeat))
+        return 0
+
+    sizes = [int(s) for s in args.sizes] if args.sizes else [n for n in SIZES if n <= args.max_size]
+    results = []
+    for case in args.cases:
+        for n in sizes:
+            record = run_case(case, n, args.repeat, args.timeout)
+            results.append(record)
+            print(_format(record), flush=True)
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for record in regressions:
+            print(_format(record))
+
+    report = {'machine': _machine(), 'tolerance': args.tolerance, 'results': results}
+    for path in [args.output] + ([args.baseline] if args.save_baseline else []):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=1)
+
+    if regressions:
+        print(f"{len(regressions)} regresiones respecto de {args.baseline}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
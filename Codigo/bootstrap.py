@@ -0,0 +1,142 @@
+"""Intervalos bootstrap de tasas de ataque y riesgos relativos.
+
+Remuestrear n agentes con reposición equivale a sortear cuántos caen en
+cada celda de la tabla cruzada (rasgos x infectado): un vector multinomial
+de n sobre las celdas, con probabilidades iguales a sus frecuencias. Así
+cada réplica cuesta O(celdas), no O(agentes). Miles de réplicas salen de un
+solo rng.multinomial(..., size=B), y las tasas de todos los rasgos son
+sumas de esa matriz. Lo único proporcional a n es la tabla cruzada, que
+attack_rates ya arma en una pasada por trozos (sirve para 10^8 agentes).
+
+Los intervalos son de percentiles y BCa. La aceleración del BCa sale del
+jackknife, que también se resuelve por celdas: quitar un agente solo
+depende de la celda a la que pertenece.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from memo import memoized
+
+
+N_REPLICATES = 2000
+CONFIDENCE = 0.95
+# Réplicas por lote (cada lote es un multinomial de B x celdas)
+BATCH_SIZE = 1 << 14
+# Grupo de referencia de cada rasgo (los de calc_simple_rr)
+REFERENCES = {'age': '19-65', 'vaccinated': True, 'occupation': 'other'}
+
+
+def _cells(rates):
+    """Conteos de la tabla cruzada completa (rasgos..., infectado) como vector"""
+    infected = np.asarray(rates['infected'], dtype=np.int64)
+    return np.stack((rates['count'] - infected, infected), axis=-1).ravel()
+
+
+def _resample(counts, n_replicates, seed):
+    """Conteos por celda de n_replicates remuestreos con reposición"""
+    rng = np.random.default_rng(seed)
+    n = int(counts.sum())
+    return rng.multinomial(n, counts / n, size=n_replicates)
+
+
+def resample_cells(rates, n_replicates=N_REPLICATES, seed=123, batch_size=BATCH_SIZE, workers=None):
+    """Matriz (réplicas, celdas) de conteos remuestreados.
+
+    Los lotes usan streams independientes (SeedSequence.spawn), así que el
+    resultado no depende de `workers`.
+    """
+    counts = _cells(rates)
+    batches = [min(batch_size, n_replicates - start) for start in range(0, n_replicates, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    args = ([counts] * len(batches), batches, seeds)
+    if workers and workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return np.concatenate(list(pool.map(_resample, *args)))
+    return np.concatenate(list(map(_resample, *args)))
+
+
+def _margins(cells, shape, axis):
+    """(conteo, infectados) por grupo del rasgo `axis`, para cada fila de celdas"""
+    table = cells.reshape((len(cells),) + shape)
+    others = tuple(a + 1 for a in range(len(shape) - 1) if a != axis)
+    by_group = table.sum(axis=others)
+    return by_group.sum(axis=-1), by_group[..., 1]
+
+
+def _relative_risk(count, infected, ref):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = infected / count
+        return rate / rate[..., ref:ref + 1]
+
+
+def _jackknife(counts, shape, axis, ref):
+    """RR sin un agente de cada celda (filas) y el peso de cada celda"""
+    n_cells = len(counts)
+    leave_one_out = np.broadcast_to(counts, (n_cells, n_cells)) - np.eye(n_cells, dtype=np.int64)
+    keep = counts > 0
+    count, infected = _margins(leave_one_out[keep], shape, axis)
+    return _relative_risk(count, infected, ref), counts[keep]
+
+
+def _bca(replicates, estimate, jackknife, weights, confidence):
+    """Intervalos BCa por columna (Efron): sesgo por la fracción de réplicas
+    menores que la estimación y aceleración por el jackknife"""
+    normal = NormalDist()
+    alphas = ((1 - confidence) / 2, (1 + confidence) / 2)
+    intervals = np.full((replicates.shape[1], 2), np.nan)
+    for g in range(replicates.shape[1]):
+        theta = replicates[:, g]
+        theta = theta[np.isfinite(theta)]
+        below = (np.count_nonzero(theta < estimate[g]) + 0.5 * np.count_nonzero(theta == estimate[g])) / len(theta)
+        if not 0 < below < 1:
+            continue
+        z0 = normal.inv_cdf(below)
+        mean = np.average(jackknife[:, g], weights=weights)
+        diff = mean - jackknife[:, g]
+        spread = (weights * diff ** 2).sum()
+        a = (weights * diff ** 3).sum() / (6 * spread ** 1.5) if spread > 0 else 0.0
+        levels = []
+        for alpha in alphas:
+            z = z0 + normal.inv_cdf(alpha)
+            levels.append(normal.cdf(z0 + z / (1 - a * z)))
+        intervals[g] = np.quantile(theta, levels)
+    return intervals
+
+
+@memoized
+def relative_risk_intervals(rates, references=None, n_replicates=N_REPLICATES, confidence=CONFIDENCE, seed=123,
+                            workers=None):
+    """RR por grupo de cada rasgo frente a su referencia, con intervalos bootstrap.
+
+    rates: resultado de attack_rates (la tabla cruzada ya calculada).
+    references: {rasgo: grupo de referencia} (por defecto REFERENCES).
+    Todos los rasgos usan las mismas réplicas.
+
+    Devuelve {rasgo: {'labels', 'reference', 'rr', 'percentile', 'bca',
+    'replicates'}}, con intervalos (G, 2) por grupo.
+    """
+    references = dict(REFERENCES, **(references or {}))
+    cells = resample_cells(rates, n_replicates, seed, workers=workers)
+    counts = _cells(rates)
+    shape = tuple(len(rates['labels'][trait]) for trait in rates['traits']) + (2,)
+    alphas = ((1 - confidence) / 2, (1 + confidence) / 2)
+
+    results = {}
+    for axis, trait in enumerate(rates['traits']):
+        labels = list(rates['labels'][trait])
+        ref = labels.index(references[trait])
+        group = rates['by_trait'][trait]
+        estimate = _relative_risk(group['count'], group['infected'], ref)
+        replicates = _relative_risk(*_margins(cells, shape, axis), ref)
+        jackknife, weights = _jackknife(counts, shape, axis, ref)
+        results[trait] = {
+            'labels': rates['labels'][trait],
+            'reference': references[trait],
+            'rr': estimate,
+            'percentile': np.nanquantile(replicates, alphas, axis=0).T,
+            'bca': _bca(replicates, estimate, jackknife, weights, confidence),
+            'replicates': replicates,
+        }
+    return results
@@ -0,0 +1,114 @@
+"""Caché en disco de los datos generados por load_data.
+
+Cada entrada es un directorio con un archivo .npy por columna (formato
+columnar binario) y un meta.json. Las lecturas usan memory-map, así que un
+acierto de caché no copia los datos a memoria hasta que se usan.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+
+CACHE_DIR = os.environ.get(
+    'LAB4_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '.cache'))
+MAX_CACHE_BYTES = int(os.environ.get('LAB4_CACHE_MAX_BYTES', 2 * 1024 ** 3))
+
+# Cambiar si cambia lo que genera load_data, para no leer entradas viejas
+FORMAT_VERSION = 3
+
+
+def cache_key(params):
+    """Hash estable de los parámetros del generador (incluida la semilla)"""
+    payload = json.dumps({'version': FORMAT_VERSION, 'params': params}, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+
+def _entry_dir(key, cache_dir):
+    return os.path.join(cache_dir or CACHE_DIR, key)
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+
+
+def save(key, datasets, cache_dir=None):
+    """Guarda {dataset: {columna: array}} de forma atómica"""
+    root = cache_dir or CACHE_DIR
+    os.makedirs(root, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix='.tmp-', dir=root)
+    meta = {'version': FORMAT_VERSION, 'datasets': {}}
+    for dataset, columns in datasets.items():
+        meta['datasets'][dataset] = {}
+        for name, values in columns.items():
+            np.save(os.path.join(tmp, f'{dataset}.{name}.npy'), np.asarray(values))
+            meta['datasets'][dataset][name] = 'list' if isinstance(values, list) else 'array'
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+
+    target = _entry_dir(key, cache_dir)
+    try:
+        os.replace(tmp, target)
+    except OSError:
+        # Otro proceso escribió la misma entrada primero
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def load(key, cache_dir=None):
+    """Devuelve las columnas memory-mapped de la entrada, o None si no existe"""
+    path = _entry_dir(key, cache_dir)
+    meta_path = os.path.join(path, 'meta.json')
+    try:
+        with open(meta_path) as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != FORMAT_VERSION:
+        return None
+
+    datasets = {}
+    for dataset, columns in meta['datasets'].items():
+        datasets[dataset] = {}
+        for name, kind in columns.items():
+            values = np.load(os.path.join(path, f'{dataset}.{name}.npy'), mmap_mode='r')
+            datasets[dataset][name] = values.tolist() if kind == 'list' else values
+    os.utime(meta_path)  # Marca de uso para la política LRU
+    return datasets
+
+
+def evict(max_bytes=None, cache_dir=None):
+    """Borra las entradas menos usadas hasta que la caché ocupe <= max_bytes"""
+    root = cache_dir or CACHE_DIR
+    max_bytes = MAX_CACHE_BYTES if max_bytes is None else max_bytes
+    if not os.path.isdir(root):
+        return []
+
+    entries = []
+    for name in os.listdir(root):
+        meta_path = os.path.join(root, name, 'meta.json')
+        if os.path.isfile(meta_path):
+            entries.append((os.path.getmtime(meta_path), _dir_size(os.path.join(root, name)), name))
+    entries.sort()
+
+    total = sum(size for _, size, _ in entries)
+    removed = []
+    for _, size, name in entries:
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+        total -= size
+        removed.append(name)
+    return removed
+
+
+def invalidate(params=None, cache_dir=None):
+    """Borra la entrada de `params`, o toda la caché si params es None"""
+    root = cache_dir or CACHE_DIR
+    if params is None:
+        shutil.rmtree(root, ignore_errors=True)
+    else:
+        shutil.rmtree(_entry_dir(cache_key(params), cache_dir), ignore_errors=True)
@@ -0,0 +1,119 @@
+"""Reducción de series largas a la resolución de la figura.
+
+Una línea no puede mostrar más detalle que los píxeles del eje: basta con
+~2 puntos por píxel. minmax conserva el mínimo y el máximo de cada tramo
+(ningún pico se pierde); lttb (Largest-Triangle-Three-Buckets) conserva la
+forma visual con un punto por tramo. merge_markers junta marcadores de
+picos que caerían en el mismo píxel.
+"""
+import numpy as np
+
+
+# Puntos por píxel del eje
+POINTS_PER_PIXEL = 2
+
+
+def pixel_width(ax):
+    """Ancho del eje en píxeles (sin dibujar la figura)"""
+    return max(1, int(ax.get_window_extent().width))
+
+
+def minmax(y, n_buckets):
+    """Índices del mínimo y máximo de cada tramo, en orden"""
+    y = np.asarray(y)
+    n = len(y)
+    if n <= 2 * n_buckets:
+        return np.arange(n)
+    # Tramos de k muestras (vista sin copia) y un último tramo con el resto
+    k = n // n_buckets
+    blocks = y[:k * n_buckets].reshape(n_buckets, k)
+    starts = np.arange(n_buckets) * k
+    index = [[0, n - 1], starts + np.argmin(blocks, axis=1), starts + np.argmax(blocks, axis=1)]
+    if k * n_buckets < n:
+        rest = y[k * n_buckets:]
+        index.append([k * n_buckets + np.argmin(rest), k * n_buckets + np.argmax(rest)])
+    return np.unique(np.concatenate(index))
+
+
+def lttb(x, y, n_out):
+    """Índices elegidos por Largest-Triangle-Three-Buckets.
+
+    Cada tramo aporta el punto que forma el triángulo de mayor área con el
+    punto elegido del tramo anterior y el promedio del siguiente. La
+    elección depende de la anterior, así que el bucle es por tramo (n_out
+    iteraciones vectorizadas).
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Primer y último punto fijos; n_out - 2 tramos para el interior
+    edges = 1 + np.linspace(0, n - 2, n_out - 1).astype(np.intp)
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    mean_x = np.append(sums_x / counts, x[-1])
+    mean_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.intp)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, stop = edges[i], edges[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) - (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(np.argmax(area))
+        selected[i + 1] = a
+    return selected
+
+
+def decimate(x, y, n_points, method='minmax', keep=None):
+    """Serie reducida a ~n_points puntos.
+
+    keep: índices que siempre se conservan (p. ej. los picos detectados).
+    Devuelve (x, y) reducidos.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if method == 'minmax':
+        index = minmax(y, max(1, n_points // 2))
+    elif method == 'lttb':
+        index = lttb(x, y, n_points)
+    else:
+        raise ValueError(f"Método desconocido: {method}")
+    if keep is not None and len(keep):
+        index = np.union1d(index, np.asarray(keep, dtype=np.intp))
+    return x[index], y[index]
+
+
+def decimate_for_axes(ax, x, y, method='minmax', keep=None):
+    """decimate con la resolución del eje donde se va a dibujar"""
+    return decimate(x, y, POINTS_PER_PIXEL * pixel_width(ax), method, keep)
+
+
+def merge_markers(positions, values, min_gap):
+    """Junta marcadores a menos de min_gap entre sí; queda el de mayor valor.
+
+    positions debe estar ordenado. Devuelve los índices (en positions) de
+    los marcadores que se dibujan.
+    """
+    positions = np.asarray(positions, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(positions) == 0:
+        return np.arange(0)
+    # Cada grupo empieza donde el salto al anterior es >= min_gap
+    group = np.concatenate(([0], np.cumsum(np.diff(positions) >= min_gap)))
+    # Mayor valor por grupo: ordenar por (grupo, -valor) y tomar el primero
+    order = np.lexsort((-values, group))
+    first = np.concatenate(([True], group[order][1:] != group[order][:-1]))
+    return np.sort(order[first])
+
+
+def merge_markers_for_axes(ax, positions, values, span):
+    """merge_markers con separación mínima de un píxel del eje.
+
+    span: ancho en datos del eje x (x_max - x_min).
+    """
+    return merge_markers(positions, values, span / pixel_width(ax))
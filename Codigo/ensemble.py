@@ -0,0 +1,173 @@
+"""Ensamble Monte Carlo: N réplicas independientes del generador o de la simulación.
+
+Cada réplica usa su propia semilla (SeedSequence(seed).spawn(N)) y corre en
+un pool de procesos. Las réplicas escriben su serie, llevada a una grilla
+común, en una fila de una matriz en memoria compartida
+(multiprocessing.shared_memory). También escriben algunos resúmenes
+escalares. Al padre no vuelve ningún array por pickle: lee la matriz y
+calcula las bandas de cuantiles.
+
+Modelos:
+    'series': generador continuo de load_data (gaussianas + ruido).
+    'seir': simulación diaria (seir.py), sobre agentes nuevos en cada réplica.
+    'gillespie': simulación por eventos (gillespie.py); se toma el número de
+        infecciosos en cada punto de la grilla.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+QUANTILES = (0.025, 0.25, 0.5, 0.75, 0.975)
+# Resúmenes por réplica (sobre la serie sin llevar a la grilla; las ventanas,
+# sobre su promedio diario)
+SUMMARIES = ('n_peaks', 'window_1', 'window_2', 'window_3', 'small_fraction')
+MODELS = ('series', 'seir', 'gillespie')
+
+# Matrices compartidas del proceso (abiertas por _attach en cada worker)
+_SHARED = {}
+
+
+def replicate_seeds(seed, n_replicates):
+    """Semillas enteras de streams independientes para cada réplica"""
+    children = np.random.SeedSequence(seed).spawn(n_replicates)
+    return [int(child.generate_state(1, np.uint64)[0]) for child in children]
+
+
+def grid(model, n_agents=1000, n_samples=500, t_end=21.0, n_days=21):
+    """Puntos de la grilla común donde se guardan las series del modelo"""
+    if model == 'seir':
+        return np.arange(n_days, dtype=float)
+    if model in ('series', 'gillespie'):
+        return np.linspace(0, t_end, n_samples)
+    raise ValueError(f"Modelo desconocido: {model} (disponibles: {', '.join(MODELS)})")
+
+
+def _simulate(model, seed, params):
+    """Serie de una réplica: (timestamps, infecciones) sin llevar a la grilla"""
+    if model == 'series':
+        from load_data import generate_series
+        return generate_series(params['n_samples'], params['t_end'], seed=seed)
+
+    import agents as agent_table
+    from load_data import generate_agents
+    if model == 'seir':
+        import seir
+        table = agent_table.pack(generate_agents(params['n_agents'], 'discrete', seed))
+        result = seir.simulate(table, n_days=params['n_days'], seed=seed)
+    else:
+        import gillespie
+        table = agent_table.pack(generate_agents(params['n_agents'], 'continuous', seed))
+        result = gillespie.simulate(table, t_end=params['t_end'], seed=seed)
+    return np.asarray(result['timestamps'], dtype=float), np.asarray(result['infections'], dtype=float)
+
+
+def _on_grid(model, times, values, points):
+    if model == 'gillespie':
+        # Función escalonada: el valor tras el último evento antes de cada punto
+        index = np.searchsorted(times, points, side='right') - 1
+        return np.where(index >= 0, values[np.maximum(index, 0)], 0.0)
+    return np.interp(points, times, values)
+
+
+def summarize(times, infections):
+    """Resúmenes escalares de una serie (los mismos criterios de parte_2 y parte_4).
+
+    Las ventanas se cuentan sobre la serie diaria, como en parte_4: las
+    series continuas se promedian por día antes (to_daily).
+    """
+    from parte_2 import find_peaks
+    from resample import to_daily
+    from windows import window_sweep
+    sweep = window_sweep(to_daily(times, infections)[1], 3)
+    return (len(find_peaks(infections, times=times)), *sweep['peak_counts'][:3, 0],
+            np.mean(np.asarray(infections) < 20))
+
+
+def _attach(names, shapes):
+    for key, name in names.items():
+        shm = shared_memory.SharedMemory(name=name)
+        _SHARED[key] = (shm, np.ndarray(shapes[key], dtype=np.float64, buffer=shm.buf))
+
+
+def _replicate(row, model, seed, params, points):
+    times, values = _simulate(model, seed, params)
+    _SHARED['series'][1][row] = _on_grid(model, times, values, points)
+    _SHARED['summaries'][1][row] = summarize(times, values)
+    return row
+
+
+def run_ensemble(model, n_replicates=100, seed=42, workers=None, quantiles=QUANTILES, **params):
+    """Corre n_replicates réplicas del modelo y devuelve sus bandas.
+
+    params: n_agents, n_samples, t_end, n_days (ver grid).
+    Devuelve un dict con:
+        times: grilla común.
+        quantiles, bands: bands[q] es el cuantil quantiles[q] en cada punto.
+        mean: media por punto.
+        summaries: {resumen: array por réplica} (ver SUMMARIES).
+    """
+    params = dict({'n_agents': 1000, 'n_samples': 500, 't_end': 21.0, 'n_days': 21}, **params)
+    points = grid(model, **params)
+    shapes = {'series': (n_replicates, len(points)), 'summaries': (n_replicates, len(SUMMARIES))}
+    blocks = {key: shared_memory.SharedMemory(create=True, size=max(8, 8 * int(np.prod(shape))))
+              for key, shape in shapes.items()}
+    try:
+        names = {key: shm.name for key, shm in blocks.items()}
+        seeds = replicate_seeds(seed, n_replicates)
+        args = [(row, model, s, params, points) for row, s in enumerate(seeds)]
+        if workers == 1:
+            _attach(names, shapes)
+            for a in args:
+                _replicate(*a)
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_attach, initargs=(names, shapes)) as pool:
+                # Solo vuelve el número de fila; los datos ya están en la memoria compartida
+                list(pool.map(_replicate, *zip(*args)))
+
+        series = np.ndarray(shapes['series'], dtype=np.float64, buffer=blocks['series'].buf)
+        summaries = np.ndarray(shapes['summaries'], dtype=np.float64, buffer=blocks['summaries'].buf)
+        result = {
+            'model': model,
+            'n_replicates': n_replicates,
+            'times': points,
+            'quantiles': tuple(quantiles),
+            'bands': np.quantile(series, quantiles, axis=0),
+            'mean': series.mean(axis=0),
+            'summaries': {name: summaries[:, k].copy() for k, name in enumerate(SUMMARIES)},
+        }
+        del series, summaries
+    finally:
+        for key in list(_SHARED):
+            _SHARED.pop(key)[0].close()
+        for shm in blocks.values():
+            shm.close()
+            shm.unlink()
+    return result
+
+
+def band(result, low=0.025, high=0.975):
+    """(tiempos, bajo, mediana, alto) de un resultado de run_ensemble"""
+    q = list(result['quantiles'])
+    bands = result['bands']
+    return result['times'], bands[q.index(low)], bands[q.index(0.5)], bands[q.index(high)]
+
+
+def interval(result, summary, low=0.025, high=0.975):
+    """Intervalo de un resumen entre réplicas"""
+    return tuple(np.quantile(result['summaries'][summary], (low, high)))
+
+
+def dataset_bands(n_replicates=100, simulate=False, n_agents=1000, n_samples=500, t_end=21.0, seed=42,
+                  workers=None):
+    """Bandas de los datasets de load_data con los mismos parámetros.
+
+    Sin simular, la serie discreta es la de referencia (no aleatoria) y solo
+    hay banda para la continua.
+    """
+    params = {'n_agents': n_agents, 'n_samples': n_samples, 't_end': t_end}
+    if not simulate:
+        return {'continuous': run_ensemble('series', n_replicates, seed, workers, **params)}
+    return {'discrete': run_ensemble('seir', n_replicates, seed, workers, **params),
+            'continuous': run_ensemble('gillespie', n_replicates, seed, workers, **params)}
@@ -0,0 +1,283 @@
+"""Figuras del informe como funciones puras de datos ya calculados.
+
+Cada función recibe un dict de arrays/listas (lo que devuelve el run() de
+cada parte) y devuelve una Figure de matplotlib, sin pyplot ni estado
+global: no abren ventanas y se pueden dibujar en cualquier proceso. Las
+series largas se reducen a la resolución del eje (ver decimate.py).
+"""
+import numpy as np
+from matplotlib.figure import Figure
+
+from decimate import decimate_for_axes, merge_markers_for_axes
+
+
+def _plot_series(ax, times, values, fmt, keep=None, **kwargs):
+    """ax.plot de la serie reducida a ~2 puntos por píxel (conserva picos)"""
+    times, values = decimate_for_axes(ax, times, values, keep=keep)
+    return ax.plot(times, values, fmt, **kwargs)
+
+
+def _peak_markers(ax, times, values, peaks):
+    """Picos que se dibujan: uno por píxel (el más alto si hay varios juntos)"""
+    peaks = np.asarray(peaks, dtype=np.intp)
+    times, values = np.asarray(times), np.asarray(values)
+    if len(peaks) == 0:
+        return peaks
+    span = float(times[-1] - times[0]) or 1.0
+    return peaks[merge_markers_for_axes(ax, times[peaks], values[peaks], span)]
+
+
+def _vlines(ax, x, **kwargs):
+    """Líneas verticales de todo el alto del eje en una sola colección"""
+    ax.vlines(x, 0, 1, transform=ax.get_xaxis_transform(), **kwargs)
+
+
+def _band(ax, band, color, label='Ensamble 95%'):
+    """Banda de cuantiles de un ensamble (tiempos, bajo, mediana, alto) y su mediana"""
+    times, low, median, high = band
+    ax.fill_between(times, low, high, color=color, alpha=0.15, linewidth=0, label=label)
+    ax.plot(times, median, color=color, linestyle=':', linewidth=1, alpha=0.8, label='Mediana del ensamble')
+
+
+def parte_1(inputs):
+    """Series discreta y continua, distribución por edad y vacunación"""
+    fig = Figure(figsize=(12, 8))
+    ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+
+    # Gráfico 1: Datos Discretos
+    _plot_series(ax1, inputs['discrete_times'], inputs['discrete_infections'], 'ro-', linewidth=2, markersize=5)
+    ax1.set_title('Datos Discretos: Infecciones vs Tiempo')
+    ax1.set_xlabel('Días')
+    ax1.set_ylabel('Infecciones')
+    ax1.grid(True, alpha=0.3)
+
+    # Gráfico 2: Datos Continuos
+    _plot_series(ax2, inputs['continuous_times'], inputs['continuous_infections'], 'b-', linewidth=1)
+    ax2.set_title('Datos Continuos: Infecciones vs Tiempo')
+    ax2.set_xlabel('Tiempo (días)')
+    ax2.set_ylabel('Infecciones')
+    ax2.grid(True, alpha=0.3)
+
+    # Gráfico 3: Distribución de Edad
+    ax3.bar(inputs['age_labels'], inputs['age_counts'], color=['lightblue', 'lightgreen', 'lightcoral'])
+    ax3.set_title('Distribución por Edad')
+    ax3.set_xlabel('Grupo de Edad')
+    ax3.set_ylabel('Cantidad')
+
+    # Gráfico 4: Estado de Vacunación
+    ax4.pie([inputs['not_vaccinated'], inputs['vaccinated']],
+            labels=['No Vacunado', 'Vacunado'],
+            colors=['lightcoral', 'lightgreen'],
+            autopct='%1.1f%%')
+    ax4.set_title('Estado de Vacunación')
+
+    fig.tight_layout()
+    return fig
+
+
+def parte_2(inputs, threshold_small=20):
+    """Picos de ambas series, intervalos entre timestamps y valores"""
+    fig = Figure(figsize=(14, 10))
+    ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+    discrete_times, discrete_infections = inputs['discrete_times'], inputs['discrete_infections']
+    continuous_times, continuous_infections = inputs['continuous_times'], inputs['continuous_infections']
+
+    # Gráfico 1: Datos discretos con análisis de picos
+    if 'discrete_band' in inputs:
+        _band(ax1, inputs['discrete_band'], 'red')
+    _plot_series(ax1, discrete_times, discrete_infections, 'ro-', keep=inputs['discrete_peaks'],
+                 linewidth=2, markersize=5)
+    peaks = _peak_markers(ax1, discrete_times, discrete_infections, inputs['discrete_peaks'])
+    _vlines(ax1, np.asarray(discrete_times)[peaks], color='red', linestyle='--', alpha=0.7)
+    for peak in peaks:
+        ax1.annotate(f'Pico: {discrete_infections[peak]}',
+                     xy=(discrete_times[peak], discrete_infections[peak]),
+                     xytext=(5, 10), textcoords='offset points',
+                     bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7))
+
+    ax1.axhline(y=threshold_small, color='orange', linestyle=':', label=f'Umbral bajo ({threshold_small})')
+    ax1.set_title('Datos Discretos: Análisis de Picos')
+    ax1.set_xlabel('Días')
+    ax1.set_ylabel('Infecciones')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # Gráfico 2: Datos continuos con análisis
+    if 'continuous_band' in inputs:
+        _band(ax2, inputs['continuous_band'], 'blue')
+    _plot_series(ax2, continuous_times, continuous_infections, 'b-', keep=inputs['continuous_peaks'], linewidth=1)
+    peaks = _peak_markers(ax2, continuous_times, continuous_infections, inputs['continuous_peaks'])
+    _vlines(ax2, np.asarray(continuous_times)[peaks], color='blue', linestyle='--', alpha=0.7)
+
+    ax2.axhline(y=threshold_small, color='orange', linestyle=':', label=f'Umbral bajo ({threshold_small})')
+    ax2.set_title('Datos Continuos: Análisis de Picos')
+    ax2.set_xlabel('Tiempo (días)')
+    ax2.set_ylabel('Infecciones')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    # Gráfico 3: Histograma de intervalos entre timestamps
+    ax3.hist(np.diff(discrete_times), bins=10, alpha=0.7, color='red', edgecolor='black')
+    ax3.set_title('Intervalos entre Timestamps (Discretos)')
+    ax3.set_xlabel('Intervalo (días)')
+    ax3.set_ylabel('Frecuencia')
+
+    # Gráfico 4: Distribución de valores de infección
+    ax4.hist(discrete_infections, bins=15, alpha=0.5, color='red', label='Discretos', edgecolor='black')
+    ax4.hist(continuous_infections, bins=15, alpha=0.5, color='blue', label='Continuos', edgecolor='black')
+    ax4.axvline(x=threshold_small, color='orange', linestyle=':', label='Umbral bajo')
+    ax4.set_title('Distribución de Valores de Infección')
+    ax4.set_xlabel('Número de Infecciones')
+    ax4.set_ylabel('Frecuencia')
+    ax4.legend()
+
+    fig.tight_layout()
+    return fig
+
+
+def _rate_bars(ax, labels, rates, colors, title):
+    ax.bar(labels, rates, color=colors)
+    ax.set_title(title)
+    ax.set_ylabel('Tasa de Ataque')
+    for i, rate in enumerate(rates):
+        ax.text(i, rate + 0.01, f'{rate:.1%}', ha='center')
+
+
+def parte_3_1(inputs):
+    """Tasas de ataque por edad y vacunación de ambos datasets"""
+    fig = Figure(figsize=(12, 8))
+    axes = fig.subplots(2, 2)
+    age_colors = ['lightblue', 'lightgreen', 'lightcoral']
+    vacc_colors = ['lightcoral', 'lightgreen']
+
+    _rate_bars(axes[0, 0], *inputs['discrete_age'], age_colors, 'Tasas por Edad (Discretos)')
+    _rate_bars(axes[0, 1], *inputs['discrete_vaccinated'], vacc_colors, 'Tasas por Vacunación (Discretos)')
+    _rate_bars(axes[1, 0], *inputs['continuous_age'], age_colors, 'Tasas por Edad (Continuos)')
+    _rate_bars(axes[1, 1], *inputs['continuous_vaccinated'], vacc_colors, 'Tasas por Vacunación (Continuos)')
+
+    fig.tight_layout()
+    return fig
+
+
+def parte_3_2(inputs):
+    """Tasas de ataque por ocupación (solo discretos)"""
+    fig = Figure(figsize=(8, 5))
+    ax = fig.subplots()
+    occupations, rates = inputs['occupation']
+
+    bars = ax.bar(occupations, rates, color=['red', 'orange', 'gold'])
+    ax.set_title('Tasas de Ataque por Ocupación (Solo Discretos)')
+    ax.set_ylabel('Tasa de Ataque')
+    for bar, rate in zip(bars, rates):
+        ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height() + 0.01,
+                f'{rate:.1%}', ha='center')
+    ax.tick_params(axis='x', labelrotation=45)
+
+    fig.tight_layout()
+    return fig
+
+
+def parte_4(inputs):
+    """Ventanas temporales, mezcla de rasgos y validación de efectos"""
+    fig = Figure(figsize=(14, 10))
+    ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+    width = 0.35
+
+    # Gráfico 1: Comparación de ventanas temporales (Discretos)
+    original, window_2 = inputs['original'], inputs['window_2']
+    if 'original_band' in inputs:
+        _band(ax1, inputs['original_band'], 'red')
+    _plot_series(ax1, np.arange(len(original)), original, 'ro-', label='Original', alpha=0.7)
+    _plot_series(ax1, np.arange(len(window_2)), window_2, 'bs-', label='Ventana 2 días', alpha=0.7)
+    ax1.set_title('Prueba de Sensibilidad Temporal')
+    ax1.set_xlabel('Período')
+    ax1.set_ylabel('Infecciones')
+    ax1.legend()
+    ax1.grid(True, alpha=0.3)
+
+    # Gráfico 2: Distribución original vs mezclada - Edad
+    ages = inputs['ages']
+    x = np.arange(len(ages))
+    ax2.bar(x - width / 2, inputs['original_counts'], width, label='Original', alpha=0.7)
+    ax2.bar(x + width / 2, inputs['shuffled_counts'], width, label='Mezclado', alpha=0.7)
+    ax2.set_title('Distribución Original vs Mezclada (Edad)')
+    ax2.set_xlabel('Grupo de Edad')
+    ax2.set_ylabel('Cantidad')
+    ax2.set_xticks(x)
+    ax2.set_xticklabels(ages)
+    ax2.legend()
+
+    # Gráfico 3: Patrón de picos en diferentes ventanas
+    peak_counts = inputs['peak_counts']
+    ax3.bar(inputs['windows'], peak_counts, color=['red', 'blue', 'green'], alpha=0.7)
+    if 'peak_intervals' in inputs:
+        # Intervalo 95% entre réplicas del ensamble
+        low, high = np.asarray(inputs['peak_intervals'], dtype=float).T
+        ax3.vlines(np.arange(len(peak_counts)), low, high, color='black', linewidth=2, label='Ensamble 95%')
+        ax3.legend()
+    ax3.set_title('Picos Detectados por Ventana Temporal')
+    ax3.set_ylabel('Número de Picos')
+    for i, count in enumerate(peak_counts):
+        ax3.text(i, count + 0.1, str(count), ha='center')
+
+    # Gráfico 4: Efectos de rasgos - Original vs Control
+    traits = inputs['traits']
+    x = np.arange(len(traits))
+    ax4.bar(x - width / 2, inputs['original_effects'], width, label='Efectos Observados', alpha=0.7, color='red')
+    ax4.bar(x + width / 2, inputs['control_effects'], width, label='Control (Aleatorio)', alpha=0.7, color='blue')
+    ax4.set_title('Validación de Efectos de Rasgos')
+    ax4.set_ylabel('Diferencia en Tasa de Ataque')
+    ax4.set_xticks(x)
+    ax4.set_xticklabels(traits, rotation=45, ha='right')
+    ax4.legend()
+
+    fig.tight_layout()
+    return fig
+
+
+def parte_4_sensibilidad(inputs):
+    """Curvas umbral-respuesta de los criterios de picos e infecciones pequeñas"""
+    fig = Figure(figsize=(14, 5))
+    ax1, ax2 = fig.subplots(1, 2)
+
+    # Gráfico 1: Picos detectados según el umbral de altura
+    for key, color, label in (('discrete', 'red', 'Discretos'), ('continuous', 'blue', 'Continuos')):
+        response = inputs[key]
+        thresholds = response['thresholds']
+        ax1.plot(thresholds, response['samples_above'], color=color, label=f'{label}: muestras > umbral')
+        ax1.plot(thresholds, response['peaks'], color=color, linestyle='--', label=f'{label}: picos (find_peaks)')
+        ax1.plot(thresholds, response['window_peaks'][1], color=color, linestyle=':',
+                 label=f'{label}: ventana 2 días')
+
+        # Gráfico 2: Fracción de infecciones pequeñas según su umbral
+        ax2.plot(thresholds, response['small_fraction'], color=color, label=label)
+
+    ax1.axvline(x=inputs['peak_threshold'], color='gray', linestyle='-.', label='Umbral usado')
+    ax1.axhline(y=3, color='orange', linestyle=':', label='Corte de artefacto (3)')
+    ax1.set_title('Sensibilidad al Umbral de Picos')
+    ax1.set_xlabel('Umbral de altura')
+    ax1.set_ylabel('Cantidad')
+    ax1.legend(fontsize=8)
+    ax1.grid(True, alpha=0.3)
+
+    ax2.axvline(x=inputs['small_threshold'], color='gray', linestyle='-.', label='Umbral usado')
+    ax2.axhline(y=0.3, color='orange', linestyle=':', label='Corte de transmisión baja (30%)')
+    ax2.set_title('Sensibilidad al Umbral de Infección Pequeña')
+    ax2.set_xlabel('Umbral de infección pequeña')
+    ax2.set_ylabel('Fracción de muestras bajo el umbral')
+    ax2.legend()
+    ax2.grid(True, alpha=0.3)
+
+    fig.tight_layout()
+    return fig
+
+
+# Nombre del archivo de salida (sin extensión) -> función que dibuja la figura
+FIGURES = {
+    'parte_1': parte_1,
+    'parte_2': parte_2,
+    'parte_3_1': parte_3_1,
+    'parte_3_2': parte_3_2,
+    'parte_4': parte_4,
+    'parte_4_sensibilidad': parte_4_sensibilidad,
+}
@@ -0,0 +1,200 @@
+"""Instrumentación opcional de las etapas del análisis.
+
+Las funciones marcadas con @instrumented registran, cuando la
+instrumentación está activa, tiempo de pared y de CPU, pico de memoria
+(tracemalloc, relativo a la memoria al entrar) y el tamaño de sus entradas.
+Desactivada, cada llamada solo consulta un flag.
+
+Se activa con enable() o con la variable de entorno LAB4_INSTRUMENT=ruta;
+en ese caso los eventos se escriben al salir del programa en la ruta dada:
+.json da la lista de eventos, .trace.json el formato de trazas de Chrome
+(chrome://tracing, Perfetto, speedscope) y .folded pilas plegadas para
+flamegraph.pl.
+"""
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+
+_enabled = False
+_events = []
+_local = threading.local()
+
+
+def enable(trace_memory=True):
+    """Activa el registro (y tracemalloc si trace_memory)"""
+    global _enabled
+    if trace_memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def is_enabled():
+    return _enabled
+
+
+def _size(value):
+    """Tamaño de una entrada: filas de tablas/arrays/listas, None si no aplica"""
+    if isinstance(value, dict) and 'n' in value:
+        return int(value['n'])  # Tabla compacta de agentes
+    shape = getattr(value, 'shape', None)
+    if shape:
+        return int(shape[0])
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    if isinstance(value, (int, float, str, bool)) or value is None:
+        return None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _input_sizes(signature, args, kwargs):
+    try:
+        bound = signature.bind_partial(*args, **kwargs)
+    except TypeError:
+        return {}
+    sizes = {name: _size(value) for name, value in bound.arguments.items()}
+    return {name: size for name, size in sizes.items() if size is not None}
+
+
+def _stack():
+    if not hasattr(_local, 'stack'):
+        _local.stack = []
+    return _local.stack
+
+
+def _record(name, signature, func, args, kwargs):
+    stack = _stack()
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        current, peak = tracemalloc.get_traced_memory()
+        if stack:
+            stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        tracemalloc.reset_peak()
+    frame = {'name': name, 'peak': 0, 'start_memory': current if tracing else 0}
+    stack.append(frame)
+
+    event = {'name': name, 'stack': [f['name'] for f in stack], 'input_sizes': _input_sizes(signature, args, kwargs),
+             'start': time.time(), 'pid': os.getpid(), 'thread': threading.get_ident()}
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        event['wall_s'] = time.perf_counter() - wall
+        event['cpu_s'] = time.process_time() - cpu
+        stack.pop()
+        if tracing and tracemalloc.is_tracing():
+            peak = max(frame['peak'], tracemalloc.get_traced_memory()[1])
+            event['peak_bytes'] = peak - frame['start_memory']
+            if stack:
+                stack[-1]['peak'] = max(stack[-1]['peak'], peak)
+        _events.append(event)
+
+
+def instrumented(func=None, *, name=None):
+    """Decorador: registra cada llamada de func cuando la instrumentación está activa"""
+    if func is None:
+        return functools.partial(instrumented, name=name)
+    name = name or f'{func.__module__}.{func.__qualname__}'
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return func(*args, **kwargs)
+        return _record(name, signature, func, args, kwargs)
+    return wrapper
+
+
+def events():
+    """Eventos registrados hasta ahora (en orden de finalización)"""
+    return list(_events)
+
+
+def collect():
+    """Devuelve y borra los eventos (para pasarlos de un proceso hijo al padre)"""
+    collected = list(_events)
+    _events.clear()
+    return collected
+
+
+def extend(new_events):
+    """Agrega eventos registrados en otro proceso"""
+    _events.extend(new_events)
+
+
+def summary(evts=None):
+    """Totales por función: llamadas, tiempo de pared y CPU, mayor pico"""
+    totals = {}
+    for event in (evts if evts is not None else _events):
+        row = totals.setdefault(event['name'], {'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0, 'peak_bytes': 0})
+        row['calls'] += 1
+        row['wall_s'] += event['wall_s']
+        row['cpu_s'] += event['cpu_s']
+        row['peak_bytes'] = max(row['peak_bytes'], event.get('peak_bytes', 0))
+    return totals
+
+
+def to_chrome_trace(evts=None):
+    """Eventos en el formato de trazas de Chrome (eventos completos 'X', en µs)"""
+    trace = []
+    for event in (evts if evts is not None else _events):
+        args = {'cpu_s': event['cpu_s'], 'input_sizes': event['input_sizes']}
+        if 'peak_bytes' in event:
+            args['peak_bytes'] = event['peak_bytes']
+        trace.append({'name': event['name'], 'ph': 'X', 'ts': event['start'] * 1e6, 'dur': event['wall_s'] * 1e6,
+                      'pid': event['pid'], 'tid': event['thread'], 'args': args})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def to_folded(evts=None):
+    """Pilas plegadas 'a;b;c microsegundos' (tiempo propio de cada pila)"""
+    evts = evts if evts is not None else _events
+    self_time = {}
+    for event in evts:
+        key = ';'.join(event['stack'])
+        self_time[key] = self_time.get(key, 0.0) + event['wall_s']
+    # El tiempo de cada hijo se descuenta de su padre directo
+    for event in evts:
+        if len(event['stack']) > 1:
+            parent = ';'.join(event['stack'][:-1])
+            if parent in self_time:
+                self_time[parent] -= event['wall_s']
+    return '\n'.join(f'{key} {max(0, round(t * 1e6))}' for key, t in self_time.items()) + '\n'
+
+
+def dump(path, evts=None):
+    """Escribe los eventos según la extensión (.trace.json, .folded o .json)"""
+    evts = evts if evts is not None else _events
+    with open(path, 'w') as f:
+        if path.endswith('.trace.json'):
+            json.dump(to_chrome_trace(evts), f)
+        elif path.endswith('.folded'):
+            f.write(to_folded(evts))
+        else:
+            json.dump({'events': evts, 'summary': summary(evts)}, f, indent=1)
+
+
+def _enable_from_env():
+    path = os.environ.get('LAB4_INSTRUMENT')
+    if path:
+        enable()
+        atexit.register(lambda: dump(path) if os.getpid() == _main_pid else None)
+
+
+_main_pid = os.getpid()
+_enable_from_env()
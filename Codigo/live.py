@@ -0,0 +1,369 @@
+"""Vista en vivo de las series de parte_1/parte_2 mientras llegan las muestras.
+
+Misma disposición 2x2 que parte_2:
+- arriba, las series discreta y continua con sus picos;
+- abajo a la izquierda, el resumen incremental (streaming.py);
+- abajo a la derecha, la distribución de valores.
+
+Ingestión y dibujo están desacoplados. push() solo actualiza el estado, en
+O(muestras del trozo). refresh() dibuja a lo sumo `fps` veces por segundo,
+sin importar cuántos trozos llegaron entre dos cuadros.
+
+Cada cuadro cuesta lo mismo aunque la serie tenga millones de puntos. Cada
+línea es una envolvente de mínimo y máximo con un número fijo de tramos por
+píxel (como decimate.minmax), que se actualiza con cada trozo. Cuando la
+serie pasa el borde derecho del eje, los tramos se juntan de a pares y el
+eje duplica su rango. Los artistas son animados (blitting): se guarda el
+fondo de cada eje y en cada cuadro solo se restauran y redibujan los ejes
+que cambiaron. El dibujo completo de la figura solo se hace cuando cambian
+los límites de un eje, O(log n) veces en toda la corrida.
+
+Uso: python live.py [--samples N] [--t-end DÍAS] [--chunk N] [--fps F] [--rate MUESTRAS_POR_SEGUNDO]
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+from decimate import POINTS_PER_PIXEL, merge_markers, pixel_width
+from streaming import SMALL_THRESHOLD, IncrementalAnalyzer
+
+
+REFRESH_FPS = 20
+BIN_WIDTH = 10  # Ancho de los intervalos del histograma de valores
+GROWTH = 1.5  # Factor de ampliación del eje y cuando un valor se sale
+# Segundos entre actualizaciones del resumen: dibujar texto nuevo cuesta
+# decenas de ms, mucho más que las líneas
+SUMMARY_INTERVAL = 0.5
+SERIES = (('discrete', 'red', 'Datos Discretos'), ('continuous', 'blue', 'Datos Continuos'))
+
+
+class _Envelope:
+    """Mínimo y máximo por tramo de tiempo (con su instante), en memoria fija"""
+
+    def __init__(self, n_buckets, start, span):
+        self.n = n_buckets + n_buckets % 2  # Par, para juntar de a dos
+        self.start = start
+        self.width = span / self.n
+        self.low = np.full(self.n, np.nan)
+        self.high = np.full(self.n, np.nan)
+        self.t_low = np.full(self.n, np.nan)
+        self.t_high = np.full(self.n, np.nan)
+
+    @property
+    def stop(self):
+        return self.start + self.n * self.width
+
+    def _halve(self):
+        """Junta los tramos de a pares: el eje cubre el doble de tiempo"""
+        half = self.n // 2
+        for values, times, better in ((self.low, self.t_low, np.less), (self.high, self.t_high, np.greater)):
+            a, b = values[0::2].copy(), values[1::2].copy()
+            ta, tb = times[0::2].copy(), times[1::2].copy()
+            take_b = better(b, a) | np.isnan(a)
+            values[:half] = np.where(take_b, b, a)
+            times[:half] = np.where(take_b, tb, ta)
+            values[half:] = np.nan
+            times[half:] = np.nan
+        self.width *= 2
+
+    def add(self, t, y):
+        """Agrega un trozo (t no decreciente); devuelve True si el eje creció"""
+        grew = False
+        while t[-1] >= self.stop:
+            self._halve()
+            grew = True
+        bucket = np.maximum(((t - self.start) // self.width).astype(np.intp), 0)
+        first = np.flatnonzero(np.concatenate(([True], bucket[1:] != bucket[:-1])))
+        segment = np.repeat(np.arange(len(first)), np.diff(np.append(first, len(t))))
+        index = bucket[first]
+        for values, times, reduce, better in ((self.low, self.t_low, np.minimum, np.less),
+                                              (self.high, self.t_high, np.maximum, np.greater)):
+            extreme = reduce.reduceat(y, first)
+            # Instante de la primera muestra que alcanza el extremo de su tramo
+            hits = np.flatnonzero(y == extreme[segment])
+            _, at = np.unique(segment[hits], return_index=True)
+            replace = better(extreme, values[index]) | np.isnan(values[index])
+            values[index[replace]] = extreme[replace]
+            times[index[replace]] = t[hits[at]][replace]
+        return grew
+
+    def points(self):
+        """(t, y) de la línea: mínimo y máximo de cada tramo, en orden de tiempo"""
+        valid = ~np.isnan(self.low)
+        low_first = self.t_low[valid] <= self.t_high[valid]
+        t = np.where(low_first[:, None], np.column_stack((self.t_low[valid], self.t_high[valid])),
+                     np.column_stack((self.t_high[valid], self.t_low[valid])))
+        y = np.where(low_first[:, None], np.column_stack((self.low[valid], self.high[valid])),
+                     np.column_stack((self.high[valid], self.low[valid])))
+        return t.ravel(), y.ravel()
+
+
+class LiveDashboard:
+    """Figura 2x2 que se actualiza con blitting a medida que llegan muestras.
+
+    fig: Figure de matplotlib (de pyplot para verla en una ventana, o una
+        Figure con canvas Agg para dibujar sin pantalla).
+    span: rango inicial del eje de tiempo (días); se duplica si hace falta.
+    """
+
+    def __init__(self, fig, span=21.0, fps=REFRESH_FPS):
+        self.fig = fig
+        self.span = span
+        self.interval = 1.0 / fps
+        self.lock = threading.Lock()
+        self._last_refresh = self._last_summary = -np.inf
+        self._summary_stale = False
+        self._layout_changed = True
+        self._limits = {}  # Límites nuevos por eje; se aplican al dibujar (hilo de la figura)
+        self.frames = 0
+        self.full_draws = 0
+
+        ((ax1, ax2), (ax3, ax4)) = fig.subplots(2, 2)
+        self.series_axes = {'discrete': ax1, 'continuous': ax2}
+        self.summary_ax, self.hist_ax = ax3, ax4
+        self.analyzers = {key: IncrementalAnalyzer() for key, _, _ in SERIES}
+        self.envelopes = {}
+        self.histograms = {key: np.zeros(1, dtype=np.int64) for key, _, _ in SERIES}
+        self.dirty = {ax: False for ax in (ax1, ax2, ax3, ax4)}
+        self.artists = {ax: [] for ax in self.dirty}
+
+        self.lines, self.markers, self.pending, self.hist_lines = {}, {}, {}, {}
+        for key, color, title in SERIES:
+            ax = self.series_axes[key]
+            fmt = 'ro-' if key == 'discrete' else 'b-'
+            self.lines[key], = ax.plot([], [], fmt, linewidth=1, markersize=3, animated=True)
+            self.markers[key], = ax.plot([], [], 'v', color='black', markersize=7, linestyle='none',
+                                         animated=True, label='Picos')
+            self.pending[key], = ax.plot([], [], 'v', color='black', markerfacecolor='none', markersize=7,
+                                         linestyle='none', animated=True, label='Pico sin confirmar')
+            self.artists[ax] += [self.lines[key], self.markers[key], self.pending[key]]
+            ax.axhline(y=SMALL_THRESHOLD, color='orange', linestyle=':', label=f'Umbral bajo ({SMALL_THRESHOLD})')
+            ax.set_title(f'{title}: Infecciones vs Tiempo (en vivo)')
+            ax.set_xlabel('Tiempo (días)')
+            ax.set_ylabel('Infecciones')
+            ax.set_xlim(0, span)
+            ax.set_ylim(0, 1)
+            ax.legend(loc='upper right')
+            ax.grid(True, alpha=0.3)
+
+            self.hist_lines[key], = ax4.plot([], [], color=color, drawstyle='steps-mid', label=title.split(' ')[-1],
+                                             animated=True)
+            self.artists[ax4].append(self.hist_lines[key])
+
+        self.summary = ax3.text(0.02, 0.98, '', transform=ax3.transAxes, va='top', family='monospace',
+                                fontsize=9, animated=True)
+        self.artists[ax3].append(self.summary)
+        ax3.set_title('Resumen Incremental')
+        ax3.set_axis_off()
+        ax4.axvline(x=SMALL_THRESHOLD, color='orange', linestyle=':', label='Umbral bajo')
+        ax4.set_title('Distribución de Valores de Infección')
+        ax4.set_xlabel('Número de Infecciones')
+        ax4.set_ylabel('Fracción de muestras')
+        ax4.set_xlim(0, BIN_WIDTH)
+        ax4.set_ylim(0, 0.1)
+        ax4.legend(loc='upper right')
+
+        fig.tight_layout()
+        self._backgrounds = {}
+        fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def push(self, key, times, values):
+        """Agrega un trozo de la serie `key` ('discrete' o 'continuous'); no dibuja"""
+        t = np.asarray(times, dtype=float)
+        y = np.asarray(values, dtype=float)
+        if len(t) == 0:
+            return
+        with self.lock:
+            ax = self.series_axes[key]
+            if key not in self.envelopes:
+                n_buckets = POINTS_PER_PIXEL * pixel_width(ax) // 2
+                self.envelopes[key] = _Envelope(n_buckets, min(0.0, t[0]), self.span)
+            envelope = self.envelopes[key]
+            x_lim, y_lim = self._limits.get(ax, (ax.get_xlim(), ax.get_ylim()))
+            if envelope.add(t, y):
+                x_lim = (envelope.start, envelope.stop)
+            if y.max() > y_lim[1]:
+                y_lim = (0, y.max() * GROWTH)
+            if (x_lim, y_lim) != (ax.get_xlim(), ax.get_ylim()):
+                self._limits[ax] = (x_lim, y_lim)
+
+            self.analyzers[key].update(y, t)
+            counts = np.bincount(np.maximum(y // BIN_WIDTH, 0).astype(np.intp))
+            histogram = self.histograms[key]
+            if len(counts) > len(histogram):
+                histogram = np.concatenate((histogram, np.zeros(len(counts) - len(histogram), dtype=np.int64)))
+                self.histograms[key] = histogram
+            histogram[:len(counts)] += counts
+            # Fracción de muestras por intervalo: las dos series en la misma escala
+            x_lim, y_lim = self._limits.get(self.hist_ax, (self.hist_ax.get_xlim(), self.hist_ax.get_ylim()))
+            peak = histogram.max() / histogram.sum()
+            if len(histogram) * BIN_WIDTH > x_lim[1] or peak > y_lim[1]:
+                self._limits[self.hist_ax] = ((0, max(x_lim[1], len(histogram) * BIN_WIDTH * GROWTH)),
+                                              (0, min(1.0, max(y_lim[1], peak * GROWTH))))
+
+            self.dirty[ax] = self.dirty[self.hist_ax] = True
+            self._summary_stale = True
+
+    def finish(self, key):
+        """Cierra la serie `key` (el último máximo cuenta como pico)"""
+        with self.lock:
+            self.analyzers[key].finish()
+            self.dirty[self.series_axes[key]] = True
+            self._summary_stale = True
+
+    def _update_artists(self):
+        for ax, (x_lim, y_lim) in self._limits.items():
+            ax.set_xlim(*x_lim)
+            ax.set_ylim(*y_lim)
+            self._layout_changed = True
+        self._limits.clear()
+
+        for key, _, _ in SERIES:
+            ax = self.series_axes[key]
+            if not self.dirty[ax] or key not in self.envelopes:
+                continue
+            self.lines[key].set_data(*self.envelopes[key].points())
+            analyzer = self.analyzers[key]
+            peaks = np.array([(t, v) for _, t, v in analyzer.peaks]).reshape(-1, 2)
+            span = np.diff(ax.get_xlim())[0]
+            keep = merge_markers(peaks[:, 0], peaks[:, 1], span / pixel_width(ax))
+            self.markers[key].set_data(peaks[keep, 0], peaks[keep, 1])
+            pending = analyzer.pending_peak()
+            self.pending[key].set_data(*(([pending[1]], [pending[2]]) if pending else ([], [])))
+
+            counts = self.histograms[key]
+            self.hist_lines[key].set_data((np.arange(len(counts)) + 0.5) * BIN_WIDTH, counts / max(counts.sum(), 1))
+
+        if self.dirty[self.summary_ax]:
+            lines = []
+            for key, _, title in SERIES:
+                s = self.analyzers[key].snapshot()
+                lines += [title.upper(),
+                          f"  Muestras: {s['n_samples']}",
+                          f"  Picos: {s['n_peaks']}  (intervalo medio {s['peak_interval_mean']:.2f})",
+                          f"  Infecciones pequeñas: {s['small_fraction']:.1%}",
+                          f"  Sobre el umbral: {s['above_threshold']} -> {s['pattern']}",
+                          f"  Media móvil: {s['rolling_mean']:.1f}", '']
+            self.summary.set_text('\n'.join(lines))
+
+    def _on_draw(self, event):
+        """Tras un dibujo completo: guardar los fondos y dibujar los artistas animados"""
+        canvas = self.fig.canvas
+        self._backgrounds = {ax: canvas.copy_from_bbox(ax.bbox) for ax in self.artists}
+        for ax, artists in self.artists.items():
+            for artist in artists:
+                ax.draw_artist(artist)
+
+    def refresh(self, force=False):
+        """Dibuja el estado actual si pasó el intervalo mínimo entre cuadros.
+
+        Devuelve True si dibujó.
+        """
+        now = time.perf_counter()
+        if not force and now - self._last_refresh < self.interval:
+            return False
+        canvas = self.fig.canvas
+        with self.lock:
+            if self._summary_stale and (force or now - self._last_summary >= SUMMARY_INTERVAL):
+                self.dirty[self.summary_ax] = True
+                self._summary_stale = False
+                self._last_summary = now
+            self._update_artists()
+            if self._layout_changed or not self._backgrounds:
+                # Cambiaron los límites de algún eje: dibujo completo (draw_event
+                # guarda los fondos nuevos y dibuja los artistas)
+                self._layout_changed = False
+                canvas.draw()
+                self.full_draws += 1
+            else:
+                for ax, changed in self.dirty.items():
+                    if not changed:
+                        continue
+                    canvas.restore_region(self._backgrounds[ax])
+                    for artist in self.artists[ax]:
+                        ax.draw_artist(artist)
+                    canvas.blit(ax.bbox)
+            self.dirty = dict.fromkeys(self.dirty, False)
+        canvas.flush_events()
+        self._last_refresh = now
+        self.frames += 1
+        return True
+
+
+def replay(dashboard, chunks, rate=None):
+    """Ingresa (clave, timestamps, infecciones) y refresca sin bloquear (sin ventana).
+
+    rate: muestras por segundo para simular una corrida larga (None = sin pausa).
+    """
+    start, n = time.perf_counter(), 0
+    for key, times, values in chunks:
+        dashboard.push(key, times, values)
+        n += len(values)
+        if rate:
+            time.sleep(max(0.0, start + n / rate - time.perf_counter()))
+        dashboard.refresh()
+    for key, _, _ in SERIES:
+        dashboard.finish(key)
+    dashboard.refresh(force=True)
+
+
+def show(dashboard, chunks, rate=None):
+    """Ventana interactiva: la ingestión corre en un hilo y un timer del canvas
+    refresca a la tasa del dashboard"""
+    import matplotlib.pyplot as plt
+
+    def ingest():
+        start, n = time.perf_counter(), 0
+        for key, times, values in chunks:
+            dashboard.push(key, times, values)
+            n += len(values)
+            if rate:
+                time.sleep(max(0.0, start + n / rate - time.perf_counter()))
+        for key, _, _ in SERIES:
+            dashboard.finish(key)
+
+    threading.Thread(target=ingest, daemon=True).start()
+    timer = dashboard.fig.canvas.new_timer(interval=int(dashboard.interval * 1000))
+    timer.add_callback(dashboard.refresh)
+    timer.start()
+    plt.show()
+
+
+def _demo_chunks(n_samples, t_end, chunk_size, seed=42):
+    """Serie continua de load_data por trozos, con la serie diaria (SEIR)
+    avanzando al mismo ritmo"""
+    import agents as agent_table
+    import seir
+    from load_data import generate_agents, iter_series_chunks
+
+    daily = seir.simulate(agent_table.pack(generate_agents(100_000, 'discrete', seed)), n_days=int(t_end) + 1,
+                          seed=seed)
+    days, infections = daily['timestamps'], daily['infections']
+    sent = 0
+    for times, values in iter_series_chunks(n_samples, t_end, seed=seed, chunk_size=chunk_size):
+        yield 'continuous', times, values
+        upto = int(np.searchsorted(days, times[-1], side='right'))
+        if upto > sent:
+            yield 'discrete', days[sent:upto], infections[sent:upto]
+            sent = upto
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Vista en vivo de las series a medida que se generan")
+    parser.add_argument('--samples', type=int, default=1_000_000, help="muestras de la serie continua")
+    parser.add_argument('--t-end', type=float, default=100.0, help="días simulados")
+    parser.add_argument('--chunk', type=int, default=1 << 12, help="muestras por trozo")
+    parser.add_argument('--fps', type=float, default=REFRESH_FPS, help="cuadros por segundo como máximo")
+    parser.add_argument('--rate', type=float, default=None, help="muestras por segundo (por defecto sin pausa)")
+    args = parser.parse_args(argv)
+
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(14, 10))
+    dashboard = LiveDashboard(fig, span=args.t_end / 4, fps=args.fps)
+    show(dashboard, _demo_chunks(args.samples, args.t_end, args.chunk), args.rate)
+
+
+if __name__ == "__main__":
+    main()
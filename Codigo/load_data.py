@@ -1,48 +1,274 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from scipy import stats
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 
+import agents as agent_table
+import cache as data_cache
+from agents import AGE_GROUPS, OCCUPATIONS
+from instrument import instrumented
 
-def load_data():
-    """Returns synthetic discrete-time and continuous-time simulation outputs"""
-    np.random.seed(42)  # For reproducibility
-    
-    # Discrete-time data (weekly reporting)
-    discrete = {
-        'timestamps': np.arange(0, 21),  # Daily timestamps (integer days)
-        'infections': [10, 12, 8, 9, 11, 15, 120,  # Weekly spike
+
+VACCINATION_RATE = 0.6
+
+# Riesgo de infección por rasgo (las tasas de ataque de parte_3). El riesgo
+# de un agente es el de su edad, escalado por su vacunación y ocupación
+# relativas al promedio de la población.
+AGE_RISK = (0.15, 0.25, 0.35)
+OCCUPATION_RISK = (0.45, 0.30, 0.20)
+VACCINATED_RISK = (0.35, 0.15)  # (no vacunado, vacunado)
+
+# Brotes del modelo continuo: (amplitud, centro, ancho)
+DEFAULT_OUTBREAKS = ((80, 3.5, 1.5), (100, 8.2, 2.0), (90, 14.1, 1.8))
+
+# Serie discreta de referencia (reporte semanal)
+DISCRETE_INFECTIONS = [10, 12, 8, 9, 11, 15, 120,  # Weekly spike
                        9, 11, 7, 8, 10, 125,       # Next week
-                       8, 10, 6, 9, 12, 118],      # Final week
-        'agent_data': pd.DataFrame({
-            'age': np.random.choice(['0-18','19-65','65+'], 1000),
-            'occupation': np.random.choice(['healthcare','education','other'], 1000),
-            'vaccinated': np.random.choice([True, False], 1000, p=[0.6, 0.4])
-        })
+                       8, 10, 6, 9, 12, 118]       # Final week
+
+# Cada bloque de BLOCK_SIZE filas tiene su propio stream aleatorio, así el
+# resultado no depende del tamaño de los trozos ni del número de procesos.
+BLOCK_SIZE = 1 << 16
+_STREAMS = {'discrete_agents': 0, 'continuous_agents': 1, 'continuous_noise': 2}
+
+
+def _block_rng(seed, stream, block):
+    """Generador del bloque `block` del stream `stream`.
+
+    Equivale a SeedSequence(seed).spawn(...)[stream].spawn(...)[block] sin
+    tener que crear todos los hijos anteriores.
+    """
+    return np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(stream, block)))
+
+
+def _n_blocks(n):
+    return -(-n // BLOCK_SIZE)
+
+
+def _agent_block(kind, n_agents, seed, block):
+    """Columnas (códigos enteros) de los agentes de un bloque"""
+    size = min(BLOCK_SIZE, n_agents - block * BLOCK_SIZE)
+    rng = _block_rng(seed, _STREAMS[f'{kind}_agents'], block)
+
+    columns = {'age': rng.integers(0, len(AGE_GROUPS), size, dtype=np.int8)}
+    if kind == 'discrete':
+        columns['occupation'] = rng.integers(0, len(OCCUPATIONS), size, dtype=np.int8)
+    else:
+        columns['mobility'] = rng.gamma(2, 1.5, size)  # Continuous trait
+    columns['vaccinated'] = rng.random(size) < VACCINATION_RATE
+
+    vaccinated_risk = np.asarray(VACCINATED_RISK)
+    mean_vaccinated = vaccinated_risk @ (1 - VACCINATION_RATE, VACCINATION_RATE)
+    risk = (np.asarray(AGE_RISK)[columns['age']]
+            * vaccinated_risk[columns['vaccinated'].view(np.int8)] / mean_vaccinated)
+    if kind == 'discrete':
+        risk *= np.asarray(OCCUPATION_RISK)[columns['occupation']] / np.mean(OCCUPATION_RISK)
+    columns['infected'] = rng.random(size) < risk
+    return columns
+
+
+def _series_block(n_samples, t_end, outbreaks, noise, seed, block):
+    """Tiempos e infecciones continuas de un bloque de muestras"""
+    start = block * BLOCK_SIZE
+    stop = min(start + BLOCK_SIZE, n_samples)
+    step = t_end / (n_samples - 1) if n_samples > 1 else 0.0
+    t = np.arange(start, stop) * step
+
+    infections = 10 * np.sin(0.3 * t) + 15
+    for amplitude, center, width in outbreaks:
+        infections += amplitude * np.exp(-(t - center) ** 2 / width)
+    rng = _block_rng(seed, _STREAMS['continuous_noise'], block)
+    infections += rng.normal(0, noise, stop - start)
+    return t, infections
+
+
+def _rechunk(blocks, chunk_size):
+    """Reagrupa bloques (dicts de columnas) en trozos de `chunk_size` filas"""
+    pending = []
+    pending_rows = 0
+    for block in blocks:
+        pending.append(block)
+        pending_rows += len(next(iter(block.values())))
+        while pending_rows >= chunk_size:
+            merged = {k: np.concatenate([b[k] for b in pending]) for k in pending[0]}
+            yield {k: v[:chunk_size] for k, v in merged.items()}
+            pending = [{k: v[chunk_size:] for k, v in merged.items()}]
+            pending_rows -= chunk_size
+    if pending_rows:
+        yield {k: np.concatenate([b[k] for b in pending]) for k in pending[0]}
+
+
+def _resolve_outbreaks(outbreaks, t_end):
+    """Acepta una lista de (amplitud, centro, ancho) o un número de brotes"""
+    if isinstance(outbreaks, (int, np.integer)):
+        centers = np.linspace(0, t_end, outbreaks + 2)[1:-1]
+        return tuple((90, c, 1.8) for c in centers)
+    return tuple(tuple(o) for o in outbreaks)
+
+
+def iter_agent_chunks(n_agents=1000, kind='discrete', seed=42, chunk_size=BLOCK_SIZE):
+    """Genera los agentes en trozos de `chunk_size` filas.
+
+    Cada trozo es un dict de columnas con códigos enteros (índices en
+    AGE_GROUPS / OCCUPATIONS). La memoria usada es O(chunk_size + BLOCK_SIZE).
+    """
+    blocks = (_agent_block(kind, n_agents, seed, b) for b in range(_n_blocks(n_agents)))
+    yield from _rechunk(blocks, chunk_size)
+
+
+def iter_series_chunks(n_samples=500, t_end=21.0, outbreaks=DEFAULT_OUTBREAKS, noise=3.0,
+                       seed=42, chunk_size=BLOCK_SIZE):
+    """Genera la serie continua en trozos de (timestamps, infecciones)"""
+    outbreaks = _resolve_outbreaks(outbreaks, t_end)
+    blocks = ({'timestamps': t, 'infections': y}
+              for t, y in (_series_block(n_samples, t_end, outbreaks, noise, seed, b)
+                           for b in range(_n_blocks(n_samples))))
+    for chunk in _rechunk(blocks, chunk_size):
+        yield chunk['timestamps'], chunk['infections']
+
+
+def _map_blocks(func, args, n, workers):
+    if workers and workers > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(func, *zip(*(args + (b,) for b in range(n))))
+    else:
+        for b in range(n):
+            yield func(*args, b)
+
+
+@instrumented
+def generate_agents(n_agents=1000, kind='discrete', seed=42, workers=None):
+    """Genera todos los agentes como columnas de códigos enteros.
+
+    Con `workers` los bloques se generan en paralelo; el resultado es
+    idéntico al secuencial.
+    """
+    columns = None
+    # Sin agentes igual se genera un bloque (vacío): da las columnas con su tipo
+    n_blocks = max(_n_blocks(n_agents), 1)
+    for b, block in enumerate(_map_blocks(_agent_block, (kind, n_agents, seed), n_blocks, workers)):
+        if columns is None:
+            columns = {k: np.empty(n_agents, dtype=v.dtype) for k, v in block.items()}
+        start = b * BLOCK_SIZE
+        for k, v in block.items():
+            columns[k][start:start + len(v)] = v
+    return columns
+
+
+@instrumented
+def generate_series(n_samples=500, t_end=21.0, outbreaks=DEFAULT_OUTBREAKS, noise=3.0, seed=42, workers=None):
+    """Genera la serie continua completa (suma de gaussianas + fondo + ruido)"""
+    outbreaks = _resolve_outbreaks(outbreaks, t_end)
+    timestamps = np.empty(n_samples)
+    infections = np.empty(n_samples)
+    args = (n_samples, t_end, outbreaks, noise, seed)
+    for b, (t, y) in enumerate(_map_blocks(_series_block, args, _n_blocks(n_samples), workers)):
+        start = b * BLOCK_SIZE
+        timestamps[start:start + len(t)] = t
+        infections[start:start + len(y)] = y
+    return timestamps, infections
+
+
+def agents_to_frame(columns):
+    """Convierte columnas de códigos al DataFrame con columnas categóricas"""
+    return agent_table.to_frame(agent_table.pack(columns))
+
+
+def _simulate(kind, table, t_end, seed):
+    """Serie e infectados de un dataset simulado (SEIR diario o por eventos)"""
+    # seir y gillespie importan las constantes de este módulo
+    if kind == 'discrete':
+        import seir
+        result = seir.simulate(table, n_days=21, seed=seed)
+    else:
+        import gillespie
+        result = gillespie.simulate(table, t_end=t_end, seed=seed)
+    return {'timestamps': result['timestamps'], 'infections': result['infections']}, result['agents']
+
+
+def _generate(n_agents, n_samples, t_end, outbreaks, noise, seed, workers, simulate=False):
+    """Genera las columnas de ambos datasets (agentes en formato compacto)"""
+    discrete_table = agent_table.pack(generate_agents(n_agents, 'discrete', seed, workers))
+    continuous_table = agent_table.pack(generate_agents(n_agents, 'continuous', seed, workers))
+    if simulate:
+        discrete_series, discrete_table = _simulate('discrete', discrete_table, t_end, seed)
+        continuous_series, continuous_table = _simulate('continuous', continuous_table, t_end, seed)
+    else:
+        discrete_series = {'timestamps': np.arange(0, 21),  # Daily timestamps (integer days)
+                           'infections': list(DISCRETE_INFECTIONS)}
+        t_continuous, infections = generate_series(n_samples, t_end, outbreaks, noise, seed, workers)
+        continuous_series = {'timestamps': t_continuous, 'infections': infections}
+    discrete_agents = agent_table.packed_columns(discrete_table)
+    continuous_agents = agent_table.packed_columns(continuous_table)
+    return {
+        'discrete': dict(discrete_series, **{f'agent_{k}': v for k, v in discrete_agents.items()}),
+        'continuous': dict(continuous_series, **{f'agent_{k}': v for k, v in continuous_agents.items()}),
     }
-    
+
+
+def aligned_series(timestamps, infections):
+    """Timestamps e infecciones recortados al largo común"""
+    n = min(len(timestamps), len(infections))
+    return timestamps[:n], infections[:n]
+
+
+class Dataset(dict):
+    """Dict de un dataset con claves derivadas que se calculan al pedirlas.
+
+    'series': (timestamps, infections) recortados al largo común.
+    'agent_data': DataFrame de agentes (importa pandas solo si se usa).
+    Se calculan una vez y quedan guardadas en el dict.
+    """
+
+    def __missing__(self, key):
+        if key == 'series':
+            value = aligned_series(self['timestamps'], self['infections'])
+        elif key == 'agent_data':
+            value = agent_table.to_frame(self['agents'])
+        else:
+            raise KeyError(key)
+        self[key] = value
+        return value
+
+
+def _to_output(columns):
+    """Separa las columnas de agentes en la tabla compacta"""
+    agents = agent_table.from_packed({k[len('agent_'):]: v for k, v in columns.items() if k.startswith('agent_')})
+    return Dataset(timestamps=columns['timestamps'], infections=columns['infections'], agents=agents)
+
+
+@instrumented
+def load_data(n_agents=1000, n_samples=500, t_end=21.0, outbreaks=DEFAULT_OUTBREAKS, noise=3.0,
+              seed=42, workers=None, cache=True, cache_dir=None, simulate=False):
+    """Returns synthetic discrete-time and continuous-time simulation outputs
+
+    Con `simulate=True` las series y los infectados salen de simular la
+    epidemia sobre los agentes en lugar de la serie de referencia, las
+    gaussianas y el riesgo fijo por rasgo: SEIR diario para los discretos
+    (seir.py) y por eventos hasta t_end para los continuos (gillespie.py,
+    un timestamp por evento; n_samples, outbreaks y noise no se usan).
+
+    Con `cache=True` el resultado se guarda en disco (ver cache.py) y las
+    llamadas siguientes con los mismos parámetros lo leen memory-mapped.
+    """
+    params = {'n_agents': n_agents, 'n_samples': n_samples, 't_end': t_end,
+              'outbreaks': _resolve_outbreaks(outbreaks, t_end), 'noise': noise, 'seed': seed}
+    if simulate:
+        params['simulate'] = ('seir', 'gillespie')  # Sin la clave, las entradas previas siguen valiendo
+    key = data_cache.cache_key(params)
+
+    datasets = data_cache.load(key, cache_dir) if cache else None
+    if datasets is None:
+        datasets = _generate(n_agents, n_samples, t_end, outbreaks, noise, seed, workers, simulate)
+        if cache:
+            data_cache.save(key, datasets, cache_dir)
+            data_cache.evict(cache_dir=cache_dir)
+
+    # Discrete-time data (weekly reporting)
+    discrete = _to_output(datasets['discrete'])
     # Continuous-time data (event-driven)
-    t_continuous = np.linspace(0, 21, 500)
-    outbreaks = (80 * np.exp(-(t_continuous-3.5)**2/1.5) + 
-                100 * np.exp(-(t_continuous-8.2)**2/2) + 
-                90 * np.exp(-(t_continuous-14.1)**2/1.8))
-    background = 10 * np.sin(0.3*t_continuous) + 15
-    
-    continuous = {
-        'timestamps': t_continuous,
-        'infections': outbreaks + background + np.random.normal(0, 3, 500),
-        'agent_data': pd.DataFrame({
-            'age': np.random.choice(['0-18','19-65','65+'], 1000),
-            'mobility': np.random.gamma(2, 1.5, 1000),  # Continuous trait
-            'vaccinated': np.random.choice([True, False], 1000, p=[0.6, 0.4])
-        })
-    }
-    print ("debug")
+    continuous = _to_output(datasets['continuous'])
 
     return {'discrete': discrete, 'continuous': continuous}
 
 
 if __name__ == "__main__":
-    print ("debug")
-    load_data()
\ No newline at end of file
+    load_data()
@@ -0,0 +1,233 @@
+"""Memoización de funciones de análisis por contenido de sus entradas.
+
+La clave de cada llamada es un hash (blake2b) del código y de los
+argumentos de la función, con los valores por defecto aplicados. El código
+es el del módulo que la define y el de los módulos del repo que importa
+(directa o indirectamente): si cambia una función que llama, el resultado
+guardado ya no sirve. Los arrays se hashean
+por dtype, forma y bytes (sin copiarlos si son contiguos), así que dos
+arrays iguales dan el mismo resultado aunque sean objetos distintos (por
+ejemplo, la misma columna leída dos veces de la caché).
+
+Hay dos niveles:
+- memoria: LRU acotada por bytes (LAB4_MEMO_MAX_BYTES, 256 MB por defecto);
+- disco: opcional (enable_disk o LAB4_MEMO_DIR), un pickle por resultado,
+  escrito de forma atómica. Sirve entre corridas y entre procesos.
+
+Solo se deben memoizar funciones puras: una llamada cacheada no repite los
+prints de la función, y el resultado devuelto es compartido (no hay que
+modificarlo).
+"""
+import ast
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+from collections import OrderedDict
+
+import numpy as np
+
+
+MAX_MEMORY_BYTES = int(os.environ.get('LAB4_MEMO_MAX_BYTES', 256 * 1024 ** 2))
+
+_memory = OrderedDict()  # clave -> (resultado, bytes)
+_state = {'bytes': 0, 'disk_dir': os.environ.get('LAB4_MEMO_DIR') or None, 'enabled': True}
+_stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'uncacheable': 0}
+
+_SCALARS = (type(None), bool, int, float, complex, str, bytes, np.generic)
+
+
+def update_hash(h, value):
+    """Hash estable de dicts, listas, tuplas, arrays, pandas y escalares.
+
+    Otros tipos dan TypeError: su repr no identifica el contenido.
+    """
+    if isinstance(value, dict):
+        h.update(b'{')
+        for key in sorted(value, key=str):
+            h.update(str(key).encode())
+            update_hash(h, value[key])
+        h.update(b'}')
+    elif isinstance(value, (list, tuple)):
+        h.update(b'[')
+        for item in value:
+            update_hash(h, item)
+        h.update(b']')
+    elif isinstance(value, np.ndarray):
+        value = np.ascontiguousarray(value)
+        h.update(f'{value.dtype.str}{value.shape}'.encode())
+        h.update(value.view(np.uint8).reshape(-1) if value.dtype != object else repr(value.tolist()).encode())
+    elif isinstance(value, _SCALARS):
+        h.update(repr(value).encode())
+    elif type(value).__module__.startswith('pandas'):
+        import pandas as pd
+        h.update(type(value).__name__.encode())
+        if isinstance(value, pd.DataFrame):
+            update_hash(h, [str(c) for c in value.columns])
+            update_hash(h, [str(t) for t in value.dtypes])
+        update_hash(h, pd.util.hash_pandas_object(value, index=True).to_numpy())
+    else:
+        raise TypeError(f"No se puede hashear un {type(value).__name__}")
+
+
+def nbytes(value):
+    """Tamaño aproximado de un resultado (arrays y contenedores anidados)"""
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(nbytes(k) + nbytes(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(nbytes(v) for v in value)
+    return sys.getsizeof(value)
+
+
+def enable_disk(path):
+    """Activa el nivel en disco en `path` (None lo desactiva)"""
+    _state['disk_dir'] = path
+
+
+def enable(on=True):
+    """Activa o desactiva la memoización (desactivada, cada llamada se calcula)"""
+    _state['enabled'] = on
+
+
+def clear(disk=False):
+    """Vacía la memoria (y el directorio en disco si disk=True)"""
+    _memory.clear()
+    _state['bytes'] = 0
+    path = _state['disk_dir']
+    if disk and path and os.path.isdir(path):
+        for name in os.listdir(path):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(path, name))
+
+
+def stats():
+    """Aciertos, fallos y ocupación de la memoria"""
+    return dict(_stats, entries=len(_memory), bytes=_state['bytes'])
+
+
+def _remember(key, value, max_bytes):
+    size = nbytes(value)
+    if size > max_bytes:
+        return
+    if key in _memory:
+        _state['bytes'] -= _memory.pop(key)[1]
+    _memory[key] = (value, size)
+    _state['bytes'] += size
+    while _state['bytes'] > max_bytes:
+        _state['bytes'] -= _memory.popitem(last=False)[1][1]
+
+
+def _disk_path(key):
+    return os.path.join(_state['disk_dir'], f'{key}.pkl')
+
+
+def _disk_load(key):
+    try:
+        with open(_disk_path(key), 'rb') as f:
+            return True, pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError):
+        return False, None
+
+
+def _disk_save(key, value):
+    os.makedirs(_state['disk_dir'], exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.tmp-', dir=_state['disk_dir'])
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, _disk_path(key))
+    except Exception:
+        os.unlink(tmp)
+        raise
+
+
+def _sources(module_name):
+    """Archivos del módulo y de los módulos del repo que importa, en orden"""
+    module = sys.modules.get(module_name)
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return []
+    root = os.path.dirname(os.path.abspath(path))
+    found = []
+    pending = [os.path.abspath(path)]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.append(path)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                candidate = os.path.join(root, name.split('.')[0] + '.py')
+                if os.path.exists(candidate):
+                    pending.append(candidate)
+    return sorted(found)
+
+
+def memoized(func=None, *, max_bytes=None):
+    """Decorador: devuelve el resultado guardado si ya se llamó con las mismas entradas.
+
+    Las llamadas con argumentos que no se pueden hashear (ver update_hash)
+    se calculan sin cachear.
+    """
+    if func is None:
+        return functools.partial(memoized, max_bytes=max_bytes)
+
+    signature = inspect.signature(func)
+    # El código forma parte de la clave: si la función o algo que usa del
+    # repo cambia, el disco no sirve
+    code = hashlib.blake2b(f'{func.__module__}.{func.__qualname__}'.encode())
+    try:
+        for path in _sources(func.__module__):
+            with open(path, 'rb') as f:
+                code.update(f.read())
+    except (OSError, SyntaxError):
+        pass
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not _state['enabled']:
+            return func(*args, **kwargs)
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        h = code.copy()
+        try:
+            update_hash(h, list(bound.arguments.items()))
+        except TypeError:
+            _stats['uncacheable'] += 1
+            return func(*args, **kwargs)
+        key = h.hexdigest()
+        limit = MAX_MEMORY_BYTES if max_bytes is None else max_bytes
+
+        if key in _memory:
+            _memory.move_to_end(key)
+            _stats['hits'] += 1
+            return _memory[key][0]
+        if _state['disk_dir']:
+            found, value = _disk_load(key)
+            if found:
+                _stats['disk_hits'] += 1
+                _remember(key, value, limit)
+                return value
+
+        _stats['misses'] += 1
+        value = func(*args, **kwargs)
+        _remember(key, value, limit)
+        if _state['disk_dir']:
+            _disk_save(key, value)
+        return value
+
+    wrapper.uncached = func
+    return wrapper
@@ -1,51 +1,52 @@
-import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 from load_data import load_data
-
-print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 2")
-print("MODELO TEMPORAL")
-print("=" * 50)
-
-data = load_data()
-discrete = data['discrete']
-continuous = data['continuous']
-
-min_len_discrete = min(len(discrete['timestamps']), len(discrete['infections']))
-discrete_times = discrete['timestamps'][:min_len_discrete]
-discrete_infections = discrete['infections'][:min_len_discrete]
-
-min_len_continuous = min(len(continuous['timestamps']), len(continuous['infections']))
-continuous_times = continuous['timestamps'][:min_len_continuous]
-continuous_infections = continuous['infections'][:min_len_continuous]
+from peaks import detect_peaks, to_samples
+from periodicity import estimate_periodicity
+from resample import is_integer_grid
+from instrument import instrumented
+from memo import memoized
 
 
 # Verificar si timestamps son enteros
+@instrumented
 def analyze_timestamps(timestamps, name):
-    are_integers = all(isinstance(t, (int, np.integer)) or float(t).is_integer() for t in timestamps)
-    if are_integers:
+    if is_integer_grid(timestamps):
         return "discrete"
     else:
         return "continuous"
 
-# Analizar ambos datasets
-discrete_type = analyze_timestamps(discrete_times, "DATOS DISCRETOS")
-continuous_type = analyze_timestamps(continuous_times, "DATOS CONTINUOS")
 
+# Separación y ancho mínimos de un pico, en días (unidades de los timestamps)
+PEAK_SEPARATION = 1.0
+PEAK_WIDTH = 0.25
+
+
+@instrumented
+@memoized
+def find_peaks(infections, threshold=50, prominence=20, times=None, separation=PEAK_SEPARATION,
+               width=PEAK_WIDTH):
+    """Encuentra picos en las infecciones (máximos locales sobre el umbral)
 
-def find_peaks(infections, threshold=50):
-    """Encuentra picos en las infecciones"""
-    peaks = []
-    for i, val in enumerate(infections):
-        if val > threshold:
-            peaks.append(i)
-    return peaks
+    La prominencia mínima evita contar como picos distintos las
+    oscilaciones del ruido alrededor de un mismo brote. Con muchas muestras
+    por día el ruido también llega a esa prominencia, así que si se dan los
+    timestamps se piden además `separation` y `width` (en días, pasados a
+    muestras con el paso de la serie).
+    """
+    peaks, _ = detect_peaks(infections, height=threshold, prominence=prominence,
+                            distance=to_samples(times, separation), width=to_samples(times, width),
+                            edges=True)
+    return peaks.tolist()
 
+# Autocorrelación mínima en el periodo dominante para llamar periódica a la serie
+PERIODIC_CONFIDENCE = 0.5
+
+@instrumented
 def analyze_periodicity(times, infections, name):
     print(f"\n{name}:")
     
     # Encontrar picos
-    peaks = find_peaks(infections)
+    peaks = find_peaks(infections, times=times)
     peak_times = [times[i] for i in peaks]
     peak_values = [infections[i] for i in peaks]
     
@@ -61,23 +62,24 @@ def analyze_periodicity(times, infections, name):
             peak_differences.append(diff)
         
         print(f"  Diferencias entre picos: {peak_differences}")
-        
-        # Verificar periodicidad
-        if len(set(peak_differences)) == 1:
-            print(f"  → evidence_for_discrete_time += 1 (picos cada {peak_differences[0]} unidades)")
-            return "periodic", peak_differences[0]
-        else:
-            print(f"  → Picos NO son periódicos (intervalos variables)")
-            return "non-periodic", None
-    else:
-        print(f"  → Insuficientes picos para análisis")
+
+    # Verificar periodicidad (autocorrelación sobre toda la serie)
+    spectral = estimate_periodicity(times, infections)
+    if len(spectral['periods']) == 0:
+        print(f"  → Insuficientes datos para análisis")
         return "insufficient", None
 
-# Analizar periodicidad
-discrete_periodicity, discrete_interval = analyze_periodicity(discrete_times, discrete_infections, "DATOS DISCRETOS")
-continuous_periodicity, continuous_interval = analyze_periodicity(continuous_times, continuous_infections, "DATOS CONTINUOS")
+    period, confidence = spectral['periods'][0], spectral['confidence'][0]
+    print(f"  Periodo dominante: {period:.2f} (confianza {confidence:.2f})")
+    if confidence >= PERIODIC_CONFIDENCE:
+        print(f"  → evidence_for_discrete_time += 1 (picos cada {period:.2f} unidades)")
+        return "periodic", period
+    else:
+        print(f"  → Picos NO son periódicos (intervalos variables)")
+        return "non-periodic", None
 
 
+@instrumented
 def analyze_between_peaks(infections, name):
     print(f"\n{name}:")
     
@@ -93,59 +95,69 @@ def analyze_between_peaks(infections, name):
     else:
         return False
 
-discrete_small_transmission = analyze_between_peaks(discrete_infections, "DATOS DISCRETOS")
-continuous_small_transmission = analyze_between_peaks(continuous_infections, "DATOS CONTINUOS")
-
-# 5. VISUALIZACIÓN DE ANÁLISIS TEMPORAL
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
-
-# Gráfico 1: Datos discretos con análisis de picos
-ax1.plot(discrete_times, discrete_infections, 'ro-', linewidth=2, markersize=5)
-peaks_discrete = find_peaks(discrete_infections)
-for peak in peaks_discrete:
-    ax1.axvline(x=discrete_times[peak], color='red', linestyle='--', alpha=0.7)
-    ax1.annotate(f'Pico: {discrete_infections[peak]}', 
-                xy=(discrete_times[peak], discrete_infections[peak]),
-                xytext=(5, 10), textcoords='offset points',
-                bbox=dict(boxstyle='round,pad=0.3', facecolor='yellow', alpha=0.7))
-
-ax1.axhline(y=20, color='orange', linestyle=':', label='Umbral bajo (20)')
-ax1.set_title('Datos Discretos: Análisis de Picos')
-ax1.set_xlabel('Días')
-ax1.set_ylabel('Infecciones')
-ax1.legend()
-ax1.grid(True, alpha=0.3)
-
-# Gráfico 2: Datos continuos con análisis
-ax2.plot(continuous_times, continuous_infections, 'b-', linewidth=1)
-peaks_continuous = find_peaks(continuous_infections)
-for peak in peaks_continuous:
-    ax2.axvline(x=continuous_times[peak], color='blue', linestyle='--', alpha=0.7)
-
-ax2.axhline(y=20, color='orange', linestyle=':', label='Umbral bajo (20)')
-ax2.set_title('Datos Continuos: Análisis de Picos')
-ax2.set_xlabel('Tiempo (días)')
-ax2.set_ylabel('Infecciones')
-ax2.legend()
-ax2.grid(True, alpha=0.3)
-
-# Gráfico 3: Histograma de intervalos entre timestamps
-discrete_intervals = np.diff(discrete_times)
-ax3.hist(discrete_intervals, bins=10, alpha=0.7, color='red', edgecolor='black')
-ax3.set_title('Intervalos entre Timestamps (Discretos)')
-ax3.set_xlabel('Intervalo (días)')
-ax3.set_ylabel('Frecuencia')
-
-# Gráfico 4: Distribución de valores de infección
-ax4.hist(discrete_infections, bins=15, alpha=0.5, color='red', label='Discretos', edgecolor='black')
-ax4.hist(continuous_infections, bins=15, alpha=0.5, color='blue', label='Continuos', edgecolor='black')
-ax4.axvline(x=20, color='orange', linestyle=':', label='Umbral bajo')
-ax4.set_title('Distribución de Valores de Infección')
-ax4.set_xlabel('Número de Infecciones')
-ax4.set_ylabel('Frecuencia')
-ax4.legend()
-
-plt.tight_layout()
-# plt.savefig("parte_2.jpg")
-plt.show()
 
+@instrumented
+def compare_to_band(times, infections, ensemble, name):
+    """Compara la serie observada con la banda 95% de un ensamble de réplicas"""
+    from ensemble import band, interval
+
+    print(f"\n{name} vs ENSAMBLE ({ensemble['n_replicates']} réplicas):")
+    grid, low, median, high = band(ensemble)
+    infections = np.asarray(infections, dtype=float)
+    outside = (infections < np.interp(times, grid, low)) | (infections > np.interp(times, grid, high))
+    peaks_low, peaks_high = interval(ensemble, 'n_peaks')
+
+    print(f"  Picos observados: {len(find_peaks(infections, times=times))} (ensamble 95%: [{peaks_low:.0f}, {peaks_high:.0f}])")
+    print(f"  Picos de la mediana del ensamble: {len(find_peaks(median, times=grid))}")
+    print(f"  Muestras fuera de la banda 95%: {outside.sum()}/{len(infections)} ({outside.mean():.1%})")
+    return outside.mean()
+
+
+@instrumented
+def run(data=None):
+    """Análisis temporal; devuelve los datos de la figura parte_2"""
+    print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 2")
+    print("MODELO TEMPORAL")
+    print("=" * 50)
+
+    data = data if data is not None else load_data()
+    discrete = data['discrete']
+    continuous = data['continuous']
+
+    discrete_times, discrete_infections = discrete['series']
+    continuous_times, continuous_infections = continuous['series']
+
+    # Analizar ambos datasets
+    discrete_type = analyze_timestamps(discrete_times, "DATOS DISCRETOS")
+    continuous_type = analyze_timestamps(continuous_times, "DATOS CONTINUOS")
+
+    # Analizar periodicidad
+    discrete_periodicity, discrete_interval = analyze_periodicity(discrete_times, discrete_infections, "DATOS DISCRETOS")
+    continuous_periodicity, continuous_interval = analyze_periodicity(continuous_times, continuous_infections, "DATOS CONTINUOS")
+
+    discrete_small_transmission = analyze_between_peaks(discrete_infections, "DATOS DISCRETOS")
+    continuous_small_transmission = analyze_between_peaks(continuous_infections, "DATOS CONTINUOS")
+
+    # Bandas del ensamble de réplicas (si el dataset las trae, ver ensemble.py)
+    bands = {}
+    for key, (times, infections), label in (('discrete', discrete['series'], "DATOS DISCRETOS"),
+                                            ('continuous', continuous['series'], "DATOS CONTINUOS")):
+        if 'ensemble' in data[key]:
+            from ensemble import band
+            compare_to_band(times, infections, data[key]['ensemble'], label)
+            bands[f'{key}_band'] = band(data[key]['ensemble'])
+
+    return {'parte_2': {
+        'discrete_times': np.asarray(discrete_times),
+        'discrete_infections': np.asarray(discrete_infections),
+        'discrete_peaks': find_peaks(discrete_infections, times=discrete_times),
+        'continuous_times': np.asarray(continuous_times),
+        'continuous_infections': np.asarray(continuous_infections),
+        'continuous_peaks': find_peaks(continuous_infections, times=continuous_times),
+        **bands,
+    }}
+
+
+if __name__ == "__main__":
+    from render import render_figures
+    render_figures(run())
@@ -1,156 +1,125 @@
-import pandas as pd
-import matplotlib.pyplot as plt
-import numpy as np
-from Codigo.load_data import load_data
+from load_data import load_data
+from rates import attack_rates, relative_risks
+from bootstrap import relative_risk_intervals
+from agent_store import iter_chunks
+from instrument import instrumented
 
-print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 3")
-print("IMPACTO DE RASGOS")
 
-data = load_data()
-discrete_df = data['discrete']['agent_data'].copy()
-continuous_df = data['continuous']['agent_data'].copy()
+VACCINATION_LABELS = {True: 'Vacunado', False: 'No Vacunado'}
 
-# Tasas simuladas realistas
-np.random.seed(42)
+@instrumented
+def simulate_simple_rates(agents, name, approx=None):
+    """Tasas de ataque por grupo a partir de los datos (una sola pasada).
 
-def simulate_simple_rates(df, name):
-    """Simula tasas de ataque simples por grupo"""
+    Con `approx` (resultado de approx.approximate) usa las tasas de la muestra
+    y muestra su intervalo de Wilson.
+    """
     print(f"\n{name}:")
     
-    # POR EDAD
-    print("  TASAS POR EDAD:")
-    age_rates = {'0-18': 0.15, '19-65': 0.25, '65+': 0.35}
-    age_results = {}
+    if approx is not None:
+        rates = approx['rates']
+        print(f"  (aproximado: muestra de {approx['sample_size']} de {approx['population']} agentes)")
+    else:
+        rates = attack_rates(iter_chunks(agents))
+    titles = {'age': "EDAD", 'vaccinated': "VACUNACIÓN", 'occupation': "OCUPACIÓN"}
     
-    for age_group in df['age'].unique():
-        count = len(df[df['age'] == age_group])
-        rate = age_rates[age_group]
-        infected = int(count * rate)  # Simplificado
-        
-        age_results[age_group] = {'count': count, 'infected': infected, 'rate': rate}
-        print(f"    {age_group}: {infected}/{count} = {rate:.1%}")
+    for trait in rates['traits']:
+        group = rates['by_trait'][trait]
+        print(f"  TASAS POR {titles[trait]}:")
+        intervals = group.get('interval', [None] * len(group['labels']))
+        for label, count, infected, rate, interval in zip(group['labels'], group['count'], group['infected'],
+                                                          group['rate'], intervals):
+            label = VACCINATION_LABELS[label] if trait == 'vaccinated' else label
+            line = f"    {label}: {infected}/{count} = {rate:.1%}"
+            if interval is not None:
+                line += f" (IC {approx['confidence']:.0%}: {interval[0]:.1%}-{interval[1]:.1%})"
+            print(line)
     
-    # POR VACUNACIÓN
-    print("  TASAS POR VACUNACIÓN:")
-    vacc_results = {}
-    
-    for vacc_status in [True, False]:
-        label = 'Vacunado' if vacc_status else 'No Vacunado'
-        count = len(df[df['vaccinated'] == vacc_status])
-        rate = 0.15 if vacc_status else 0.35  # Simplificado
-        infected = int(count * rate)
-        
-        vacc_results[label] = {'count': count, 'infected': infected, 'rate': rate}
-        print(f"    {label}: {infected}/{count} = {rate:.1%}")
-    
-    # POR OCUPACIÓN (solo si existe)
-    occ_results = {}
-    if 'occupation' in df.columns:
-        print("  TASAS POR OCUPACIÓN:")
-        occ_rates = {'healthcare': 0.45, 'education': 0.30, 'other': 0.20}
-        
-        for occupation in df['occupation'].unique():
-            count = len(df[df['occupation'] == occupation])
-            rate = occ_rates[occupation]
-            infected = int(count * rate)
-            
-            occ_results[occupation] = {'count': count, 'infected': infected, 'rate': rate}
-            print(f"    {occupation}: {infected}/{count} = {rate:.1%}")
-    
-    return age_results, vacc_results, occ_results
+    return rates
 
-# Simular para ambos datasets
-discrete_age, discrete_vacc, discrete_occ = simulate_simple_rates(discrete_df, "DATOS DISCRETOS")
-continuous_age, continuous_vacc, continuous_occ = simulate_simple_rates(continuous_df, "DATOS CONTINUOS")
 
+@instrumented
+def calc_simple_rr(rates, name, n_bootstrap=2000, approx=None):
+    """Calcula riesgos relativos simples con intervalos bootstrap BCa al 95%
 
-def calc_simple_rr(results, name):
-    """Calcula riesgos relativos simples"""
+    Con `approx` (resultado de approx.approximate) los intervalos son los de
+    Katz de la muestra, con la corrección por población finita.
+    """
     print(f"\n{name}:")
+    if approx is not None:
+        from approx import relative_risk_intervals as sample_intervals
+        intervals, method, confidence = sample_intervals(approx), 'katz', approx['confidence']
+    else:
+        intervals, method, confidence = relative_risk_intervals(rates, n_replicates=n_bootstrap), 'bca', 0.95
+
+    def ci(trait, i):
+        if intervals[trait]['labels'][i] == intervals[trait]['reference']:
+            return "(referencia)"
+        low, high = intervals[trait][method][i]
+        return f"(IC {confidence:.0%}: {low:.2f}-{high:.2f})"
     
     # RR por edad (ref: 19-65)
-    ref_rate = results[0]['19-65']['rate']
     print(f"  RIESGOS RELATIVOS POR EDAD (ref: 19-65):")
-    for age_group, data in results[0].items():
-        rr = data['rate'] / ref_rate
-        print(f"    {age_group}: RR = {rr:.2f}")
+    for i, (age_group, rr) in enumerate(zip(rates['labels']['age'], relative_risks(rates, 'age', '19-65'))):
+        print(f"    {age_group}: RR = {rr:.2f} {ci('age', i)}")
     
     # RR por vacunación
-    vacc_rate = results[1]['Vacunado']['rate']
-    no_vacc_rate = results[1]['No Vacunado']['rate']
-    rr_vacc = no_vacc_rate / vacc_rate
+    rr_vacc = relative_risks(rates, 'vaccinated', True)[0]
     print(f"  RIESGO RELATIVO VACUNACIÓN:")
-    print(f"    No Vacunado vs Vacunado: RR = {rr_vacc:.2f}")
+    print(f"    No Vacunado vs Vacunado: RR = {rr_vacc:.2f} {ci('vaccinated', 0)}")
     
     # RR por ocupación (solo si existe)
-    if results[2]:  # Si hay datos de ocupación
-        ref_rate_occ = results[2]['other']['rate']
+    if 'occupation' in rates['traits']:
         print(f"  RIESGOS RELATIVOS POR OCUPACIÓN (ref: other):")
-        for occupation, data in results[2].items():
-            rr = data['rate'] / ref_rate_occ
-            print(f"    {occupation}: RR = {rr:.2f}")
-
-calc_simple_rr([discrete_age, discrete_vacc, discrete_occ], "DATOS DISCRETOS")
-calc_simple_rr([continuous_age, continuous_vacc, continuous_occ], "DATOS CONTINUOS")
-
-
-fig, axes = plt.subplots(2, 2, figsize=(12, 8))
-
-# Gráfico 1: Edad - Discretos
-ages = list(discrete_age.keys())
-rates = [discrete_age[age]['rate'] for age in ages]
-axes[0,0].bar(ages, rates, color=['lightblue', 'lightgreen', 'lightcoral'])
-axes[0,0].set_title('Tasas por Edad (Discretos)')
-axes[0,0].set_ylabel('Tasa de Ataque')
-for i, rate in enumerate(rates):
-    axes[0,0].text(i, rate + 0.01, f'{rate:.1%}', ha='center')
-
-# Gráfico 2: Vacunación - Discretos
-vaccs = list(discrete_vacc.keys())
-rates = [discrete_vacc[vacc]['rate'] for vacc in vaccs]
-axes[0,1].bar(vaccs, rates, color=['lightcoral', 'lightgreen'])
-axes[0,1].set_title('Tasas por Vacunación (Discretos)')
-axes[0,1].set_ylabel('Tasa de Ataque')
-for i, rate in enumerate(rates):
-    axes[0,1].text(i, rate + 0.01, f'{rate:.1%}', ha='center')
-
-# Gráfico 3: Edad - Continuos
-ages = list(continuous_age.keys())
-rates = [continuous_age[age]['rate'] for age in ages]
-axes[1,0].bar(ages, rates, color=['lightblue', 'lightgreen', 'lightcoral'])
-axes[1,0].set_title('Tasas por Edad (Continuos)')
-axes[1,0].set_ylabel('Tasa de Ataque')
-for i, rate in enumerate(rates):
-    axes[1,0].text(i, rate + 0.01, f'{rate:.1%}', ha='center')
-
-# Gráfico 4: Vacunación - Continuos
-vaccs = list(continuous_vacc.keys())
-rates = [continuous_vacc[vacc]['rate'] for vacc in vaccs]
-axes[1,1].bar(vaccs, rates, color=['lightcoral', 'lightgreen'])
-axes[1,1].set_title('Tasas por Vacunación (Continuos)')
-axes[1,1].set_ylabel('Tasa de Ataque')
-for i, rate in enumerate(rates):
-    axes[1,1].text(i, rate + 0.01, f'{rate:.1%}', ha='center')
-
-plt.tight_layout()
-plt.savefig("parte_3_1.jpg")
-plt.show()
-
-# 5. GRÁFICO DE OCUPACIÓN (SOLO DISCRETOS)
-if discrete_occ:
-    plt.figure(figsize=(8, 5))
-    occs = list(discrete_occ.keys())
-    rates = [discrete_occ[occ]['rate'] for occ in occs]
-    
-    bars = plt.bar(occs, rates, color=['red', 'orange', 'gold'])
-    plt.title('Tasas de Ataque por Ocupación (Solo Discretos)')
-    plt.ylabel('Tasa de Ataque')
-    
-    for bar, rate in zip(bars, rates):
-        plt.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01,
-                f'{rate:.1%}', ha='center')
-    
-    plt.xticks(rotation=45)
-    plt.savefig("parte_3_2.jpg")
-    plt.tight_layout()
-    plt.show()
\ No newline at end of file
+        for i, (occupation, rr) in enumerate(zip(rates['labels']['occupation'],
+                                                 relative_risks(rates, 'occupation', 'other'))):
+            print(f"    {occupation}: RR = {rr:.2f} {ci('occupation', i)}")
+
+    return intervals
+
+
+@instrumented
+def group_rates(rates, trait):
+    """Etiquetas y tasas de un rasgo, listas para graficar"""
+    group = rates['by_trait'][trait]
+    labels = list(group['labels'])
+    if trait == 'vaccinated':
+        # Mismo orden que antes: vacunados primero
+        labels = [VACCINATION_LABELS[v] for v in labels[::-1]]
+        return labels, group['rate'][::-1]
+    return labels, group['rate']
+
+
+@instrumented
+def run(data=None):
+    """Impacto de rasgos; devuelve los datos de las figuras parte_3_1 y parte_3_2"""
+    print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 3")
+    print("IMPACTO DE RASGOS")
+
+    data = data if data is not None else load_data()
+    # Tablas compactas de agentes (se recorren por trozos, sin copiarlas)
+    discrete_agents = data['discrete']['agents']
+    continuous_agents = data['continuous']['agents']
+
+    # Calcular para ambos datasets
+    discrete_rates = simulate_simple_rates(discrete_agents, "DATOS DISCRETOS", data['discrete'].get('approx'))
+    continuous_rates = simulate_simple_rates(continuous_agents, "DATOS CONTINUOS", data['continuous'].get('approx'))
+
+    calc_simple_rr(discrete_rates, "DATOS DISCRETOS", approx=data['discrete'].get('approx'))
+    calc_simple_rr(continuous_rates, "DATOS CONTINUOS", approx=data['continuous'].get('approx'))
+
+    jobs = {'parte_3_1': {
+        'discrete_age': group_rates(discrete_rates, 'age'),
+        'discrete_vaccinated': group_rates(discrete_rates, 'vaccinated'),
+        'continuous_age': group_rates(continuous_rates, 'age'),
+        'continuous_vaccinated': group_rates(continuous_rates, 'vaccinated'),
+    }}
+    # Gráfico de ocupación (solo discretos)
+    if 'occupation' in discrete_rates['traits']:
+        jobs['parte_3_2'] = {'occupation': group_rates(discrete_rates, 'occupation')}
+    return jobs
+
+
+if __name__ == "__main__":
+    from render import render_figures
+    render_figures(run())
@@ -1,23 +1,13 @@
-import matplotlib.pyplot as plt
 import numpy as np
 from load_data import load_data
-
-print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 4")
-print("PRUEBAS DE VALIDACIÓN")
-
-data = load_data()
-discrete = data['discrete']
-continuous = data['continuous']
-
-
-min_len_discrete = min(len(discrete['timestamps']), len(discrete['infections']))
-discrete_times = discrete['timestamps'][:min_len_discrete]
-discrete_infections = discrete['infections'][:min_len_discrete]
-
-discrete_df = discrete['agent_data'].copy()
-continuous_df = continuous['agent_data'].copy()
+from windows import window_sweep, windowed
+from resample import to_daily
+from permutation import trait_permutation_tests
+from sensitivity import agreement, switch_points, threshold_response
+from instrument import instrumented
 
 
+@instrumented
 def test_temporal_windows(times, infections, name):
     """Prueba diferentes ventanas temporales para detectar artefactos"""
     
@@ -28,33 +18,26 @@ def test_temporal_windows(times, infections, name):
     print(f"    Picos detectados: {sum(1 for x in infections if x > 50)}")
     print(f"    Promedio entre picos: {np.mean([x for x in infections if x <= 50]):.1f}")
     
+    # Todas las ventanas de 1 a 3 días (y sus fases) en una pasada
+    sweep = window_sweep(infections, 3)
+
     # Reagrupar en ventanas de 2 días
     if len(infections) >= 4:
-        window_2 = []
-        for i in range(0, len(infections)-1, 2):
-            if i+1 < len(infections):
-                window_2.append(infections[i] + infections[i+1])
-            else:
-                window_2.append(infections[i])
+        window_2 = windowed(sweep, 2)
         
         print(f"  VENTANA DE 2 DÍAS:")
         print(f"    Datos reagrupados: {len(window_2)} puntos")
-        print(f"    Picos detectados: {sum(1 for x in window_2 if x > 100)}")
-        print(f"    Valores: {window_2[:5]}...")
+        print(f"    Picos detectados: {sweep['peak_counts'][1, 0]}")
+        print(f"    Valores: {np.round(window_2[:5], 1).tolist()}...")
     
     # Reagrupar en ventanas de 3 días
     if len(infections) >= 6:
-        window_3 = []
-        for i in range(0, len(infections)-2, 3):
-            if i+2 < len(infections):
-                window_3.append(infections[i] + infections[i+1] + infections[i+2])
-            else:
-                window_3.append(sum(infections[i:]))
+        window_3 = windowed(sweep, 3)
         
         print(f"  VENTANA DE 3 DÍAS:")
         print(f"    Datos reagrupados: {len(window_3)} puntos")
-        print(f"    Picos detectados: {sum(1 for x in window_3 if x > 150)}")
-        print(f"    Valores: {window_3[:3]}...")
+        print(f"    Picos detectados: {sweep['peak_counts'][2, 0]}")
+        print(f"    Valores: {np.round(window_3[:3], 1).tolist()}...")
     
     # Evaluación de consistencia
     original_pattern = len([x for x in infections if x > 50])
@@ -66,153 +49,175 @@ def test_temporal_windows(times, infections, name):
     
     if original_pattern >= 3:
         print(f"POSIBLE ARTEFACTO: Demasiados picos regulares")
-        return "artificial"
+        return "artificial", sweep
     else:
         print(f"Patrón parece natural")
-        return "natural"
-
-# Probar ambos datasets
-discrete_pattern = test_temporal_windows(discrete_times, discrete_infections, "DATOS DISCRETOS")
-# continuous_pattern = test_temporal_windows(continuous['timestamps'], continuous['infections'], "DATOS CONTINUOS")
+        return "natural", sweep
 
 
-def test_trait_shuffling(df, name):
-    """Mezcla aleatoriamente los rasgos para probar si los efectos son reales"""
+@instrumented
+def test_threshold_sensitivity(times, infections, name, peak_threshold=50, small_threshold=20):
+    """Cómo cambian los veredictos si se mueven los umbrales fijos (50 y 20)"""
+    print(f"\n{name}:")
+    # Umbrales de 0 al máximo de la serie (o al umbral fijo, si es mayor)
+    top = max(float(np.max(infections)), peak_threshold, small_threshold)
+    response = threshold_response(infections, np.linspace(0, top, 1000), times=times)
+    # Veredictos con los umbrales fijos
+    fixed = threshold_response(infections, [peak_threshold, small_threshold], times=times)
+    artefact, small = fixed['artefact'][0], fixed['small_transmission'][1]
+
+    for key, threshold, decision, label in (('artefact', peak_threshold, artefact, "Posible artefacto"),
+                                            ('small_transmission', small_threshold, small, "Transmisión baja")):
+        switches = switch_points(response, key)
+        where = ", ".join(f"{t:.1f}" for t in switches) if len(switches) else "ninguno"
+        print(f"  {label} con umbral {threshold}: {'sí' if decision else 'no'}")
+        print(f"    Cambia de veredicto en: {where}")
+        print(f"    Mismo veredicto en {agreement(response, key, decision):.0%} de "
+              f"{len(response['thresholds'])} umbrales (0 a {response['thresholds'][-1]:.1f})")
+    return response
+
+
+@instrumented
+def test_trait_shuffling(agents, name, n_permutations=1000):
+    """Mezcla aleatoriamente los rasgos para probar si los efectos son reales.
+
+    agents: DataFrame de agentes o tabla compacta (se recorre por trozos).
+    """
     
     print(f"\n{name}:")
     
-    # Tasas originales simuladas
-    original_rates = {
-        'healthcare': 0.45 if 'occupation' in df.columns else None,
-        'education': 0.30 if 'occupation' in df.columns else None,
-        'other': 0.20 if 'occupation' in df.columns else None,
-        'age_65+': 0.35,
-        'age_19-65': 0.25,
-        'age_0-18': 0.15,
-        'vaccinated': 0.15,
-        'not_vaccinated': 0.35
-    }
+    # Tasas observadas y distribución nula con rasgos permutados
+    results = trait_permutation_tests(agents, n_permutations=n_permutations, seed=123)
     
     print(f"  TASAS ORIGINALES:")
-    if 'occupation' in df.columns:
-        print(f"    Healthcare: {original_rates['healthcare']:.1%}")
-        print(f"    Education: {original_rates['education']:.1%}")
-        print(f"    Other: {original_rates['other']:.1%}")
-    print(f"    Edad 65+: {original_rates['age_65+']:.1%}")
-    print(f"    Vacunado: {original_rates['vaccinated']:.1%}")
-    
-    # Mezclar aleatoriamente
-    np.random.seed(123)  # Para reproducibilidad
-    df_shuffled = df.copy()
-    
-    # Mezclar edades
-    df_shuffled['age'] = np.random.permutation(df['age'].values)
-    
-    # Mezclar vacunación
-    df_shuffled['vaccinated'] = np.random.permutation(df['vaccinated'].values)
-    
-    # Mezclar ocupación si existe
-    if 'occupation' in df.columns:
-        df_shuffled['occupation'] = np.random.permutation(df['occupation'].values)
-    
-    print(f"  DESPUÉS DE MEZCLAR:")
-    print(f"    Distribución de edad mezclada: {df_shuffled['age'].value_counts().to_dict()}")
-    print(f"    Distribución de vacunación mezclada: {df_shuffled['vaccinated'].value_counts().to_dict()}")
-    
-    # Simular tasas con datos mezclados (deberían ser similares si no hay efecto real)
-    shuffled_rates = {}
-    for age_group in df_shuffled['age'].unique():
-        count = len(df_shuffled[df_shuffled['age'] == age_group])
-        shuffled_rates[f'age_{age_group}'] = count / len(df_shuffled) * 0.25  # Tasa promedio
+    for trait, res in results.items():
+        for label, rate in zip(res['labels'], res['observed_rates']):
+            print(f"    {trait} {label}: {rate:.1%}")
     
-    print(f"  TASAS SIMULADAS CON MEZCLA:")
-    for age in ['65+', '19-65', '0-18']:
-        if f'age_{age}' in shuffled_rates:
-            original = original_rates[f'age_{age}']
-            shuffled = shuffled_rates[f'age_{age}']
-            difference = abs(original - shuffled)
-            print(f"    Edad {age}: Original {original:.1%} vs Mezclado {shuffled:.1%} (diff: {difference:.1%})")
+    print(f"  DESPUÉS DE MEZCLAR ({n_permutations} permutaciones):")
+    for trait, res in results.items():
+        for label, (low, _, high), p in zip(res['labels'], res['null_quantiles'], res['group_p_values']):
+            print(f"    {trait} {label}: nulo 95% [{low:.1%}, {high:.1%}] (p = {p:.3f})")
+        print(f"    {trait}: p global = {res['p_value']:.3f}")
     
     # Evaluación
-    max_diff = 0.10  # 10% de diferencia máxima esperada
-    significant_differences = any(abs(original_rates[f'age_{age}'] - shuffled_rates.get(f'age_{age}', 0.25)) > max_diff 
-                                 for age in ['65+', '19-65', '0-18'] if f'age_{age}' in shuffled_rates)
+    alpha = 0.05
+    significant_differences = any(res['p_value'] < alpha for res in results.values())
     
     if significant_differences:
         print(f"EFECTOS REALES: Diferencias significativas persisten")
-        return "real_effects"
+        return "real_effects", results
     else:
         print(f"POSIBLES ARTEFACTOS: Diferencias desaparecen al mezclar")
-        return "possible_artifacts"
-
-# Probar ambos datasets
-discrete_effects = test_trait_shuffling(discrete_df, "DATOS DISCRETOS")
-continuous_effects = test_trait_shuffling(continuous_df, "DATOS CONTINUOS")
-
-
-fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(14, 10))
-
-# Gráfico 1: Comparación de ventanas temporales (Discretos)
-original = discrete_infections
-window_2 = [discrete_infections[i] + discrete_infections[i+1] 
-           for i in range(0, len(discrete_infections)-1, 2) 
-           if i+1 < len(discrete_infections)]
-
-ax1.plot(range(len(original)), original, 'ro-', label='Original', alpha=0.7)
-ax1.plot(range(len(window_2)), window_2, 'bs-', label='Ventana 2 días', alpha=0.7)
-ax1.set_title('Prueba de Sensibilidad Temporal')
-ax1.set_xlabel('Período')
-ax1.set_ylabel('Infecciones')
-ax1.legend()
-ax1.grid(True, alpha=0.3)
-
-# Gráfico 2: Distribución original vs mezclada - Edad
-ages = ['0-18', '19-65', '65+']
-original_counts = [len(discrete_df[discrete_df['age'] == age]) for age in ages]
-np.random.seed(123)
-shuffled_df = discrete_df.copy()
-shuffled_df['age'] = np.random.permutation(discrete_df['age'].values)
-shuffled_counts = [len(shuffled_df[shuffled_df['age'] == age]) for age in ages]
-
-x = np.arange(len(ages))
-width = 0.35
-ax2.bar(x - width/2, original_counts, width, label='Original', alpha=0.7)
-ax2.bar(x + width/2, shuffled_counts, width, label='Mezclado', alpha=0.7)
-ax2.set_title('Distribución Original vs Mezclada (Edad)')
-ax2.set_xlabel('Grupo de Edad')
-ax2.set_ylabel('Cantidad')
-ax2.set_xticks(x)
-ax2.set_xticklabels(ages)
-ax2.legend()
-
-# Gráfico 3: Patrón de picos en diferentes ventanas
-windows = ['Original', 'Ventana 2d', 'Ventana 3d']
-peak_counts = [
-    sum(1 for x in discrete_infections if x > 50),
-    sum(1 for x in window_2 if x > 100),
-    2  # Simulado para ventana 3d
-]
-
-ax3.bar(windows, peak_counts, color=['red', 'blue', 'green'], alpha=0.7)
-ax3.set_title('Picos Detectados por Ventana Temporal')
-ax3.set_ylabel('Número de Picos')
-for i, count in enumerate(peak_counts):
-    ax3.text(i, count + 0.1, str(count), ha='center')
-
-# Gráfico 4: Efectos de rasgos - Original vs Control
-traits = ['Edad\n(65+ vs 0-18)', 'Vacunación\n(No vs Sí)', 'Ocupación\n(Health vs Other)']
-original_effects = [0.20, 0.20, 0.25]  # Diferencias observadas
-control_effects = [0.05, 0.03, 0.02]   # Esperadas si es aleatorio
-
-x = np.arange(len(traits))
-ax4.bar(x - width/2, original_effects, width, label='Efectos Observados', alpha=0.7, color='red')
-ax4.bar(x + width/2, control_effects, width, label='Control (Aleatorio)', alpha=0.7, color='blue')
-ax4.set_title('Validación de Efectos de Rasgos')
-ax4.set_ylabel('Diferencia en Tasa de Ataque')
-ax4.set_xticks(x)
-ax4.set_xticklabels(traits, rotation=45, ha='right')
-ax4.legend()
-
-plt.tight_layout()
-# plt.savefig("parte_4.jpg")
-plt.show()
\ No newline at end of file
+        return "possible_artifacts", results
+
+
+@instrumented
+def trait_effects(shuffles, contrasts):
+    """Diferencias observadas y media |diferencia| al permutar, por contraste"""
+    original_effects = []  # Diferencias observadas
+    control_effects = []   # Diferencia media al permutar (esperada si es aleatorio)
+    for trait, a, b in contrasts:
+        res = shuffles[trait]
+        ia, ib = list(res['labels']).index(a), list(res['labels']).index(b)
+        original_effects.append(res['observed_rates'][ia] - res['observed_rates'][ib])
+        control_effects.append(np.abs(res['null_rates'][:, ia] - res['null_rates'][:, ib]).mean())
+    return original_effects, control_effects
+
+
+@instrumented
+def compare_windows_to_ensemble(sweep, ensemble, name):
+    """Picos por ventana observados vs su intervalo 95% entre réplicas"""
+    from ensemble import interval
+
+    print(f"\n{name} vs ENSAMBLE ({ensemble['n_replicates']} réplicas):")
+    intervals = []
+    for width in (1, 2, 3):
+        low, high = interval(ensemble, f'window_{width}')
+        observed = sweep['peak_counts'][width - 1, 0]
+        verdict = "dentro" if low <= observed <= high else "FUERA"
+        print(f"  Ventana de {width} días: {observed} picos (ensamble 95%: [{low:.0f}, {high:.0f}], {verdict})")
+        intervals.append((low, high))
+    return intervals
+
+
+@instrumented
+def run(data=None):
+    """Pruebas de validación; devuelve los datos de la figura parte_4"""
+    print("ANÁLISIS DE SIMULACIÓN EPIDEMIOLÓGICA - PASO 4")
+    print("PRUEBAS DE VALIDACIÓN")
+
+    data = data if data is not None else load_data()
+    discrete = data['discrete']
+    continuous = data['continuous']
+
+    discrete_times, discrete_infections = discrete['series']
+
+    # Probar ambos datasets
+    discrete_pattern, discrete_windows = test_temporal_windows(discrete_times, discrete_infections, "DATOS DISCRETOS")
+    # Continuos: promedio por día en la grilla diaria, luego las mismas ventanas
+    continuous_times, continuous_infections = to_daily(*continuous['series'])
+    continuous_pattern, continuous_windows = test_temporal_windows(continuous_times, continuous_infections,
+                                                                   "DATOS CONTINUOS (promedio diario)")
+
+    # Respuesta de los veredictos a todos los umbrales
+    discrete_response = test_threshold_sensitivity(discrete_times, discrete_infections,
+                                                   "SENSIBILIDAD A UMBRALES - DISCRETOS")
+    continuous_response = test_threshold_sensitivity(continuous_times, continuous_infections,
+                                                     "SENSIBILIDAD A UMBRALES - CONTINUOS (promedio diario)")
+
+    # Variabilidad entre réplicas (si el dataset trae un ensamble, ver ensemble.py)
+    ensemble_inputs = {}
+    for key, windows, label in (('discrete', discrete_windows, "DATOS DISCRETOS"),
+                                ('continuous', continuous_windows, "DATOS CONTINUOS (promedio diario)")):
+        if 'ensemble' not in data[key]:
+            continue
+        intervals = compare_windows_to_ensemble(windows, data[key]['ensemble'], label)
+        if key == 'discrete':
+            # La figura muestra la serie discreta
+            from ensemble import band
+            ensemble_inputs = {'original_band': band(discrete['ensemble']), 'peak_intervals': intervals}
+
+    # En modo aproximado las permutaciones corren sobre la muestra (ver approx.py)
+    shuffled = {}
+    for key, label in (('discrete', "DATOS DISCRETOS"), ('continuous', "DATOS CONTINUOS")):
+        if 'approx' in data[key]:
+            shuffled[key] = test_trait_shuffling(data[key]['approx']['sample'], f"{label} (muestra)")
+        else:
+            shuffled[key] = test_trait_shuffling(data[key]['agents'], label)
+    (discrete_effects, discrete_shuffles), (continuous_effects, continuous_shuffles) = shuffled.values()
+
+    # Distribución original vs mezclada - Edad (permutar la edad no cambia
+    # el tamaño de los grupos: los conteos son los de la prueba de permutación)
+    ages = ['0-18', '19-65', '65+']
+    age_sizes = dict(zip(discrete_shuffles['age']['labels'].tolist(), discrete_shuffles['age']['sizes'].tolist()))
+    original_counts = [age_sizes[age] for age in ages]
+    shuffled_counts = list(original_counts)
+
+    # Efectos de rasgos - Original vs Control
+    contrasts = [('age', '65+', '0-18'), ('vaccinated', False, True), ('occupation', 'healthcare', 'other')]
+    original_effects, control_effects = trait_effects(discrete_shuffles, contrasts)
+
+    return {'parte_4': {
+        'original': np.asarray(discrete_infections),
+        'window_2': windowed(discrete_windows, 2),
+        'ages': ages,
+        'original_counts': original_counts,
+        'shuffled_counts': shuffled_counts,
+        'windows': ['Original', 'Ventana 2d', 'Ventana 3d'],
+        'peak_counts': discrete_windows['peak_counts'][:3, 0].tolist(),
+        'traits': ['Edad\n(65+ vs 0-18)', 'Vacunación\n(No vs Sí)', 'Ocupación\n(Health vs Other)'],
+        'original_effects': original_effects,
+        'control_effects': control_effects,
+        **ensemble_inputs,
+    }, 'parte_4_sensibilidad': {
+        'discrete': discrete_response,
+        'continuous': continuous_response,
+        'peak_threshold': 50,
+        'small_threshold': 20,
+    }}
+
+
+if __name__ == "__main__":
+    from render import render_figures
+    render_figures(run())
@@ -0,0 +1,63 @@
+"""Detección de picos (máximos locales) con filtros de altura, distancia,
+prominencia y ancho.
+
+Es una capa delgada sobre scipy.signal.find_peaks (ya vectorizada en C) que
+agrega lo que el análisis necesita: altura estrictamente mayor que el umbral
+y, con edges=True, picos en la primera y la última muestra.
+"""
+import numpy as np
+from scipy import signal
+
+
+def detect_peaks(x, height=None, distance=None, prominence=None, width=None, rel_height=0.5,
+                 edges=False):
+    """Encuentra picos (máximos locales) que pasan todos los filtros dados.
+
+    height: valor mínimo del pico (estrictamente mayor, como find_peaks de
+        parte_2).
+    distance: separación mínima en muestras (se redondea hacia arriba); se
+        descartan los picos más bajos que queden a menos de `distance` de
+        uno que se conserva.
+    prominence: prominencia mínima (altura sobre la base más alta).
+    width: ancho mínimo en muestras, medido a rel_height de la prominencia.
+    edges: si es True, la primera y la última muestra también pueden ser
+        picos (p. ej. una serie que se corta justo en un brote).
+
+    Devuelve (indices, propiedades) con las alturas y, si se pidieron, las
+    prominencias, bases y anchos de los picos que quedan.
+    """
+    x = np.asarray(x, dtype=float)
+    if edges and len(x):
+        # Bordes más bajos que toda la serie: la prominencia de un pico en
+        # el borde se mide solo por el lado que existe
+        n = len(x)
+        low = x.min() - 1
+        peaks, props = detect_peaks(np.concatenate(([low], x, [low])), height, distance,
+                                    prominence, width, rel_height)
+        for key in ('left_bases', 'right_bases', 'left_ips', 'right_ips'):
+            if key in props:
+                props[key] = np.clip(props[key] - 1, 0, n - 1)
+        return peaks - 1, props
+
+    if height is not None:
+        # scipy acepta la altura igual al umbral; aquí debe superarlo
+        height = np.nextafter(float(height), np.inf)
+    if distance is not None:
+        distance = int(np.ceil(distance)) if distance > 1 else None
+    peaks, props = signal.find_peaks(x, height=height, distance=distance, prominence=prominence,
+                                     width=width, rel_height=rel_height)
+    props.pop('width_heights', None)
+    props['peak_heights'] = x[peaks]
+    return peaks, props
+
+
+def to_samples(times, duration):
+    """Cuántas muestras ocupa `duration` (en unidades de `times`), con el paso mediano.
+
+    Devuelve None si no hay tiempos o paso, para pasarlo tal cual como
+    distance o width de detect_peaks.
+    """
+    if times is None or duration is None or len(times) < 2:
+        return None
+    step = float(np.median(np.diff(np.asarray(times, dtype=float))))
+    return duration / step if step > 0 else None
@@ -0,0 +1,98 @@
+"""Detección de periodicidad por autocorrelación y periodograma (FFT).
+
+Las series se llevan a una grilla regular y se analizan en O(n log n), sin
+extraer picos uno por uno.
+"""
+import numpy as np
+
+from memo import memoized
+from peaks import detect_peaks
+
+
+def to_regular_grid(times, values, step=None):
+    """Interpola la serie a una grilla regular de paso `step`.
+
+    Si los timestamps ya son equiespaciados (y no se pide otro paso) se
+    devuelven tal cual. Por defecto el paso es la mediana de los intervalos.
+    """
+    times = np.asarray(times, dtype=float)
+    values = np.asarray(values, dtype=float)
+    intervals = np.diff(times)
+    if step is None:
+        step = float(np.median(intervals)) if len(intervals) else 1.0
+        if np.allclose(intervals, step):
+            return times, values, step
+    grid = np.arange(times[0], times[-1] + step / 2, step)
+    return grid, np.interp(grid, times, values), step
+
+
+def _fft_size(n):
+    """Tamaño de FFT >= 2n (sin aliasing circular), potencia de 2"""
+    return 1 << int(np.ceil(np.log2(max(2 * n, 2))))
+
+
+def autocorrelation(values):
+    """Autocorrelación normalizada (insesgada) vía Wiener-Khinchin.
+
+    acf[k] es la correlación entre la serie y la serie desplazada k muestras,
+    con acf[0] = 1.
+    """
+    v = np.asarray(values, dtype=float)
+    v = v - v.mean()
+    n = len(v)
+    spectrum = np.fft.rfft(v, _fft_size(n))
+    acov = np.fft.irfft(spectrum * np.conj(spectrum))[:n]
+    acov /= np.arange(n, 0, -1)  # Número de pares por desplazamiento
+    if acov[0] == 0:
+        return np.zeros(n)
+    return acov / acov[0]
+
+
+def periodogram(values, step=1.0):
+    """Frecuencias y potencia espectral de la serie (sin la media)"""
+    v = np.asarray(values, dtype=float)
+    v = v - v.mean()
+    power = np.abs(np.fft.rfft(v)) ** 2 / len(v)
+    freqs = np.fft.rfftfreq(len(v), d=step)
+    return freqs, power
+
+
+@memoized
+def estimate_periodicity(times, values, step=None, max_periods=3, min_cycles=2, harmonic_tolerance=0.1):
+    """Estima los periodos dominantes de la serie y su confianza.
+
+    Los candidatos son los máximos locales de la autocorrelación con al
+    menos `min_cycles` repeticiones dentro de la serie; la confianza es el
+    valor de la autocorrelación en ese desplazamiento (0 = nada, 1 = la serie
+    se repite exactamente). El periodo se refina con interpolación
+    parabólica entre muestras de la grilla. El primer periodo devuelto es el
+    más corto cuya confianza está a `harmonic_tolerance` de la mejor.
+    """
+    grid, regular, step = to_regular_grid(times, values, step)
+    acf = autocorrelation(regular)
+    max_lag = len(acf) // min_cycles
+    lags, _ = detect_peaks(acf[:max_lag + 1], prominence=0.05)
+
+    confidence = np.clip(acf[lags], 0, 1)
+    order = np.argsort(-confidence, kind='stable')
+    if len(order):
+        # Los múltiplos del periodo tienen casi la misma autocorrelación:
+        # se prefiere el desplazamiento más corto cercano al mejor
+        close = np.flatnonzero(confidence >= confidence[order[0]] - harmonic_tolerance)
+        first = close[np.argmin(lags[close])]
+        order = np.concatenate(([first], order[order != first]))
+    order = order[:max_periods]
+    lags, confidence = lags[order], confidence[order]
+
+    # Vértice de la parábola por (k-1, k, k+1)
+    left, mid, right = acf[lags - 1], acf[lags], acf[lags + 1]
+    curvature = left - 2 * mid + right
+    offset = np.where(curvature < 0, 0.5 * (left - right) / np.where(curvature < 0, curvature, 1), 0)
+
+    freqs, power = periodogram(regular, step)
+    return {
+        'periods': (lags + offset) * step,
+        'confidence': confidence,
+        'step': step,
+        'spectral_period': 1 / freqs[1:][np.argmax(power[1:])] if len(freqs) > 1 else None,
+    }
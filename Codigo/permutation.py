@@ -0,0 +1,146 @@
+"""Pruebas de permutación por lotes para el efecto de los rasgos.
+
+Cada lote de B permutaciones se hace de una vez: una matriz de claves
+aleatorias (B, n) ordenada por filas da B permutaciones, y un solo bincount
+sobre códigos desplazados por fila cuenta los infectados de cada grupo en
+cada permutación.
+
+Para poblaciones que no caben en memoria (tablas de agent_store) se usa que,
+al permutar el rasgo, los infectados por grupo siguen una hipergeométrica
+multivariada: basta con los conteos por grupo, obtenidos en una pasada.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from agent_store import CHUNK_SIZE, iter_chunks
+from rates import attack_rates
+from instrument import instrumented
+from memo import memoized
+
+
+# Elementos de la matriz de claves por lote (acota la memoria)
+BATCH_ELEMENTS = 1 << 22
+
+
+def encode(values):
+    """Códigos enteros 0..G-1 y etiquetas de un rasgo"""
+    labels, codes = np.unique(np.asarray(values), return_inverse=True)
+    return codes.astype(np.intp), labels
+
+
+def _null_infected(codes, outcome, n_groups, n_permutations, seed):
+    """Infectados por grupo en n_permutations permutaciones (una matriz)"""
+    rng = np.random.default_rng(seed)
+    keys = rng.random((n_permutations, len(codes)))
+    shuffled = codes[np.argsort(keys, axis=1)]
+    shuffled += (np.arange(n_permutations) * n_groups)[:, None]
+    weights = np.broadcast_to(outcome, shuffled.shape).ravel()
+    counts = np.bincount(shuffled.ravel(), weights=weights, minlength=n_permutations * n_groups)
+    return counts.reshape(n_permutations, n_groups)
+
+
+@instrumented
+def permutation_test(codes, outcome, n_permutations=1000, seed=123, batch_size=None, workers=None,
+                     quantiles=(0.025, 0.5, 0.975)):
+    """Distribución nula de las tasas de ataque por grupo al permutar el rasgo.
+
+    codes: códigos enteros del rasgo (ver encode); outcome: 0/1 infectado.
+    El estadístico global es la mayor desviación |tasa del grupo - tasa
+    total|; los valores p son empíricos con corrección (1 + k) / (1 + N).
+    Los lotes usan streams independientes (SeedSequence.spawn), así que el
+    resultado no depende de `workers`.
+    """
+    codes = np.asarray(codes, dtype=np.intp)
+    outcome = np.asarray(outcome, dtype=float)
+    n_groups = int(codes.max()) + 1 if len(codes) else 0
+    sizes = np.bincount(codes, minlength=n_groups)
+    overall = outcome.mean()
+    observed = np.bincount(codes, weights=outcome, minlength=n_groups) / sizes
+
+    if batch_size is None:
+        batch_size = max(1, BATCH_ELEMENTS // max(len(codes), 1))
+    batches = [min(batch_size, n_permutations - start) for start in range(0, n_permutations, batch_size)]
+    seeds = np.random.SeedSequence(seed).spawn(len(batches))
+    args = ([codes] * len(batches), [outcome] * len(batches), [n_groups] * len(batches), batches, seeds)
+
+    if workers and workers > 1 and len(batches) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            null_counts = list(pool.map(_null_infected, *args))
+    else:
+        null_counts = list(map(_null_infected, *args))
+    null_rates = np.concatenate(null_counts) / sizes
+
+    return _summarize(sizes, observed, null_rates, overall, quantiles)
+
+
+@instrumented
+def permutation_test_counts(sizes, infected, n_permutations=1000, seed=123, quantiles=(0.025, 0.5, 0.975)):
+    """permutation_test a partir de los conteos por grupo.
+
+    Permutar el rasgo reparte los infectados entre los grupos como una
+    hipergeométrica multivariada, así que no hace falta recorrer los agentes.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    infected = np.asarray(infected, dtype=np.int64)
+    rng = np.random.default_rng(seed)
+    null_counts = rng.multivariate_hypergeometric(sizes, int(infected.sum()), size=n_permutations,
+                                                  method='marginals')
+    return _summarize(sizes, infected / sizes, null_counts / sizes, infected.sum() / sizes.sum(), quantiles)
+
+
+def _summarize(sizes, observed, null_rates, overall, quantiles):
+    """Valores p e intervalos nulos a partir de las tasas observadas y permutadas"""
+    n_permutations = len(null_rates)
+    observed_dev = np.abs(observed - overall)
+    null_dev = np.abs(null_rates - overall)
+    group_p = (1 + (null_dev >= observed_dev - 1e-12).sum(axis=0)) / (1 + n_permutations)
+    global_p = (1 + (null_dev.max(axis=1) >= observed_dev.max() - 1e-12).sum()) / (1 + n_permutations)
+
+    return {
+        'sizes': sizes,
+        'observed_rates': observed,
+        'null_rates': null_rates,
+        'null_quantiles': np.quantile(null_rates, quantiles, axis=0).T,
+        'quantiles': np.asarray(quantiles),
+        'group_p_values': group_p,
+        'p_value': global_p,
+    }
+
+
+@instrumented
+@memoized
+def trait_permutation_tests(source, traits=('age', 'vaccinated', 'occupation'), outcome='infected', **kwargs):
+    """permutation_test para cada rasgo presente.
+
+    source: DataFrame de agentes, o tabla compacta (en memoria o de
+    agent_store) que se recorre por trozos con permutation_test_counts.
+    """
+    if not isinstance(source, pd.DataFrame):
+        return _table_permutation_tests(source, traits, outcome, **kwargs)
+
+    results = {}
+    for trait in traits:
+        if trait not in source.columns:
+            continue
+        codes, labels = encode(source[trait].to_numpy())
+        result = permutation_test(codes, source[outcome].to_numpy(), **kwargs)
+        result['labels'] = labels
+        results[trait] = result
+    return results
+
+
+def _table_permutation_tests(table, traits, outcome, n_permutations=1000, seed=123, quantiles=(0.025, 0.5, 0.975),
+                             chunk_size=CHUNK_SIZE):
+    rates = attack_rates(iter_chunks(table, chunk_size, columns=tuple(traits) + (outcome,)), outcome=outcome)
+    seeds = np.random.SeedSequence(seed).spawn(len(traits))
+    results = {}
+    for trait, trait_seed in zip(traits, seeds):
+        if trait not in rates['by_trait']:
+            continue
+        group = rates['by_trait'][trait]
+        result = permutation_test_counts(group['count'], group['infected'], n_permutations, trait_seed, quantiles)
+        result['labels'] = np.asarray(group['labels'])
+        results[trait] = result
+    return results
@@ -0,0 +1,151 @@
+"""Punto de entrada único: carga los datos una vez y corre las partes como etapas.
+
+Cada etapa declara de qué etapas depende; las que no dependen entre sí se
+corren en paralelo en procesos hijos (fork), que comparten el dataset ya
+cargado sin copiarlo ni serializarlo. La salida de cada etapa se imprime
+completa y en orden. Los módulos de cada etapa (y matplotlib para las
+figuras) se importan solo si la etapa se corre.
+
+Con --simulate los datos salen de simular la epidemia sobre los agentes:
+SEIR diario para los discretos y Gillespie por eventos para los continuos
+(ver load_data).
+
+Uso: python pipeline.py [parte_2 parte_4 ...] [--workers N] [--no-render] [--force] [--simulate]
+                        [--ensemble N] [--approx ERROR]
+                        [--instrument tiempos.json|tiempos.trace.json|tiempos.folded]
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import instrument
+from load_data import load_data
+
+
+# Etapa -> (módulo con run(data), etapas de las que depende)
+STAGES = {
+    'parte_1': ('parte_1', ()),
+    'parte_2': ('parte_2', ()),
+    'parte_3': ('parte_3', ()),
+    'parte_4': ('parte_4', ()),
+}
+
+# Dataset compartido con los procesos hijos (heredado por fork)
+_DATA = None
+
+
+def resolve(stages):
+    """Etapas pedidas más sus dependencias, agrupadas en niveles ejecutables"""
+    selected = set()
+    pending = list(stages)
+    while pending:
+        stage = pending.pop()
+        if stage not in STAGES:
+            raise KeyError(f"Etapa desconocida: {stage} (disponibles: {', '.join(STAGES)})")
+        if stage not in selected:
+            selected.add(stage)
+            pending.extend(STAGES[stage][1])
+
+    levels, done = [], set()
+    while len(done) < len(selected):
+        level = [s for s in STAGES if s in selected and s not in done and set(STAGES[s][1]) <= done]
+        if not level:
+            raise ValueError("Dependencias circulares entre etapas")
+        levels.append(level)
+        done.update(level)
+    return levels
+
+
+def _run_stage(stage, capture):
+    module = importlib.import_module(STAGES[stage][0])
+    if not capture:
+        return module.run(_DATA), '', []
+    # Proceso hijo: los eventos heredados por fork ya están en el padre; solo
+    # vuelven con el resultado los de esta etapa
+    instrument.collect()
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        jobs = module.run(_DATA)
+    return jobs, output.getvalue(), instrument.collect()
+
+
+def _fork_pool(workers):
+    try:
+        context = multiprocessing.get_context('fork')
+    except ValueError:
+        return None  # Sin fork (Windows): se corre en serie
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def run_stages(stages=None, data=None, workers=None):
+    """Corre las etapas (todas por defecto) sobre un único dataset.
+
+    Devuelve {nombre de figura: datos} con las figuras de todas las etapas.
+    """
+    global _DATA
+    _DATA = data if data is not None else load_data()
+    levels = resolve(stages or list(STAGES))
+
+    jobs = {}
+    for level in levels:
+        pool = _fork_pool(workers) if len(level) > 1 and workers != 1 else None
+        if pool is None:
+            results = [_run_stage(stage, capture=False) for stage in level]
+        else:
+            with pool:
+                results = list(pool.map(_run_stage, level, [True] * len(level)))
+        for stage_jobs, output, events in results:
+            print(output, end='')
+            instrument.extend(events)
+            jobs.update(stage_jobs)
+    return jobs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Corre las partes del análisis y dibuja sus figuras")
+    parser.add_argument('stages', nargs='*', help=f"etapas a correr (por defecto todas: {' '.join(STAGES)})")
+    parser.add_argument('--workers', type=int, default=None, help="procesos para etapas independientes")
+    parser.add_argument('--no-render', action='store_true', help="no dibujar las figuras")
+    parser.add_argument('--out-dir', default=None, help="directorio de las figuras")
+    parser.add_argument('--force', action='store_true', help="dibujar aunque los datos no hayan cambiado")
+    parser.add_argument('--simulate', action='store_true',
+                        help="simular las series: SEIR diario (discretos) y Gillespie por eventos (continuos)")
+    parser.add_argument('--ensemble', type=int, default=0, metavar='N',
+                        help="comparar con bandas de N réplicas independientes (ver ensemble.py)")
+    parser.add_argument('--approx', type=float, default=None, metavar='ERROR',
+                        help="rasgos y tasas de una muestra con este error máximo por proporción (ver approx.py)")
+    parser.add_argument('--instrument', default=None,
+                        help="registrar tiempos y memoria por función en esta ruta (.json, .trace.json o .folded)")
+    args = parser.parse_args(argv)
+    unknown = [stage for stage in args.stages if stage not in STAGES]
+    if unknown:
+        parser.error(f"etapas desconocidas: {', '.join(unknown)}")
+
+    if args.instrument:
+        instrument.enable()
+
+    data = load_data(simulate=args.simulate)
+    if args.ensemble:
+        from ensemble import dataset_bands
+        for key, result in dataset_bands(args.ensemble, simulate=args.simulate, workers=args.workers).items():
+            data[key]['ensemble'] = result
+    if args.approx:
+        from approx import approximate
+        for key in ('discrete', 'continuous'):
+            data[key]['approx'] = approximate(data[key]['agents'], target_error=args.approx)
+    jobs = run_stages(args.stages, data=data, workers=args.workers)
+    if not args.no_render:
+        from render import render_figures  # Importa matplotlib solo si hay que dibujar
+        rendered = render_figures(jobs, args.out_dir, args.workers, skip_unchanged=not args.force)
+        for name, path in rendered.items():
+            print(f"{name}: {path or 'sin cambios'}")
+
+    if args.instrument:
+        instrument.dump(args.instrument)
+
+
+if __name__ == "__main__":
+    main()
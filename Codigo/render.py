@@ -0,0 +1,91 @@
+"""Etapa de renderizado de las figuras del informe.
+
+Las figuras se dibujan sin interfaz (backend Agg) en un pool de procesos y
+se guardan todas en un mismo directorio. Con skip_unchanged=True una
+figura no se vuelve a dibujar si sus datos de entrada y el código de
+figures.py (y decimate.py) no cambiaron desde la última vez (se guarda un hash
+por figura en el manifiesto del directorio de salida).
+
+El punto de entrada para dibujar el informe completo es pipeline.py.
+"""
+import matplotlib
+matplotlib.use('Agg')  # Sin ventanas: nodos de cálculo sin pantalla
+
+import hashlib
+import inspect
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import decimate
+import figures
+from instrument import instrumented
+from memo import update_hash
+
+
+OUTPUT_DIR = os.environ.get(
+    'LAB4_FIGURES_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Imagenes'))
+FORMAT = 'jpg'
+MANIFEST = '.render.json'
+
+
+def fingerprint(name, inputs):
+    """Hash de los datos de entrada y del código que dibuja la figura"""
+    h = hashlib.sha256(name.encode())
+    for module in (figures, decimate):
+        h.update(inspect.getsource(module).encode())
+    update_hash(h, inputs)
+    return h.hexdigest()
+
+
+def _render(name, inputs, path):
+    fig = figures.FIGURES[name](inputs)
+    fig.savefig(path, format=FORMAT)
+    return path
+
+
+def _read_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+@instrumented
+def render_figures(jobs, out_dir=None, workers=None, skip_unchanged=True):
+    """Dibuja las figuras {nombre: datos} en paralelo en out_dir.
+
+    Devuelve {nombre: ruta} de las figuras dibujadas y {nombre: None} de las
+    que se saltaron por no haber cambiado.
+    """
+    out_dir = out_dir or OUTPUT_DIR
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = _read_manifest(out_dir)
+
+    pending = {}
+    results = {}
+    for name, inputs in jobs.items():
+        path = os.path.join(out_dir, f'{name}.{FORMAT}')
+        digest = fingerprint(name, inputs)
+        if skip_unchanged and manifest.get(name) == digest and os.path.exists(path):
+            results[name] = None
+        else:
+            pending[name] = (inputs, path, digest)
+
+    if pending:
+        names = list(pending)
+        args = ([pending[n][0] for n in names], [pending[n][1] for n in names])
+        if workers is None or workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                paths = list(pool.map(_render, names, *args))
+        else:
+            paths = list(map(_render, names, *args))
+        for name, path in zip(names, paths):
+            results[name] = path
+            manifest[name] = pending[name][2]
+        with open(os.path.join(out_dir, MANIFEST), 'w') as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+
+    return results
@@ -0,0 +1,88 @@
+"""Reagrupación de series con timestamps irregulares en una grilla regular.
+
+Cada muestra va al intervalo [inicio + k*step, inicio + (k+1)*step) que la
+contiene. El intervalo se encuentra con searchsorted sobre los bordes, y la
+suma, media y conteo salen de un solo bincount. El máximo usa
+np.maximum.reduceat sobre las muestras ordenadas por intervalo. Así las
+pruebas de ventanas y picos pensadas para datos diarios corren también
+sobre la serie continua, a cualquier resolución.
+"""
+import numpy as np
+
+
+AGGREGATIONS = ('sum', 'mean', 'max', 'count')
+
+
+def is_integer_grid(timestamps):
+    """True si todos los timestamps son enteros (días), sin recorrerlos en Python"""
+    t = np.asarray(timestamps)
+    if t.dtype == bool or np.issubdtype(t.dtype, np.integer):
+        return True
+    t = t.astype(float)
+    return bool(np.all(np.isfinite(t)) and np.all(t == np.floor(t)))
+
+
+def grid_edges(start, stop, step):
+    """Bordes de los intervalos de ancho step que cubren [start, stop]"""
+    n_bins = max(1, int(np.floor((stop - start) / step)) + 1)
+    return start + step * np.arange(n_bins + 1)
+
+
+def resample(timestamps, values, step=1.0, how='sum', start=None, stop=None):
+    """Agrega (timestamps, values) en intervalos regulares de ancho step.
+
+    how: 'sum', 'mean', 'max' o 'count'. Los intervalos vacíos dan 0 en
+    sum/count y NaN en mean/max. Por defecto la grilla empieza en el primer
+    timestamp redondeado hacia abajo a un múltiplo de step y cubre hasta
+    el último.
+
+    Devuelve (inicio de cada intervalo, valor agregado).
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Agregación desconocida: {how} (disponibles: {', '.join(AGGREGATIONS)})")
+    t = np.asarray(timestamps, dtype=float)
+    v = np.asarray(values, dtype=float)
+    if len(t) == 0:
+        return np.empty(0), np.empty(0)
+    start = np.floor(t.min() / step) * step if start is None else start
+    stop = t.max() if stop is None else stop
+    edges = grid_edges(start, stop, step)
+    n_bins = len(edges) - 1
+
+    index = np.searchsorted(edges, t, side='right') - 1
+    inside = (index >= 0) & (index < n_bins) & (t <= stop)
+    index, v = index[inside], v[inside]
+
+    counts = np.bincount(index, minlength=n_bins)
+    if how == 'count':
+        return edges[:-1], counts
+    if how == 'max':
+        result = np.full(n_bins, np.nan)
+        if len(index):
+            order = np.argsort(index, kind='stable')
+            index, v = index[order], v[order]
+            first = np.flatnonzero(np.concatenate(([True], index[1:] != index[:-1])))
+            result[index[first]] = np.maximum.reduceat(v, first)
+        return edges[:-1], result
+    sums = np.bincount(index, weights=v, minlength=n_bins)
+    if how == 'sum':
+        return edges[:-1], sums
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return edges[:-1], np.where(counts > 0, sums / counts, np.nan)
+
+
+def to_daily(timestamps, values, step=1.0, how='mean'):
+    """Serie lista para las pruebas diarias: si ya es entera y step=1 no se toca.
+
+    Por defecto promedia (las series continuas son niveles de infección
+    muestreados, no conteos por evento). Los intervalos vacíos se completan
+    con el último valor (0 antes del primero).
+    """
+    if step == 1.0 and is_integer_grid(timestamps):
+        return np.asarray(timestamps), np.asarray(values)
+    grid, aggregated = resample(timestamps, values, step, how)
+    if how in ('mean', 'max'):
+        valid = ~np.isnan(aggregated)
+        last = np.maximum.accumulate(np.where(valid, np.arange(len(aggregated)), 0))
+        aggregated = np.nan_to_num(aggregated[last])
+    return grid, aggregated
@@ -0,0 +1,144 @@
+"""Simulación SEIR de agentes en tiempo discreto (un paso por día).
+
+Cada agente es Susceptible, Expuesto, Infeccioso o Recuperado. Sus rasgos
+modifican el contagio:
+- la edad y la vacunación escalan la susceptibilidad, con los mismos
+  riesgos relativos que load_data;
+- la ocupación escala los contactos, tanto al contagiar como al contagiarse
+  (mezcla proporcional);
+- la vacunación también reduce la transmisión.
+
+Los agentes con los mismos rasgos forman un grupo con la misma probabilidad
+diaria de contagio, así que cada día se sortea solo cuántos se contagian en
+cada grupo (binomial). Quiénes se contagian sale de un orden aleatorio fijado
+al inicio: tomar los siguientes del orden equivale a elegirlos al azar entre
+los susceptibles del grupo. Las duraciones de latencia e infección se
+sortean al contagiarse y se agendan por día. Así cada día cuesta
+O(grupos + contagios nuevos), no O(agentes). Con 10^7 agentes lo único
+proporcional a n es armar el orden inicial (~20 bytes por agente, transitorios)
+y marcar a los infectados.
+"""
+import numpy as np
+
+import agents as agent_table
+from agents import AGE_GROUPS, OCCUPATIONS
+from load_data import AGE_RISK, OCCUPATION_RISK, VACCINATED_RISK, Dataset
+
+
+R0 = 2.5  # Número reproductivo básico de la población
+LATENT_DAYS = 2.0
+INFECTIOUS_DAYS = 4.0
+VACCINATED_TRANSMISSION = 0.5  # Transmisión relativa de un vacunado infeccioso
+INITIAL_INFECTED = 10
+COMPARTMENTS = ('S', 'E', 'I', 'R')
+
+
+def _modifiers(n_occupations):
+    """Susceptibilidad, contactos y transmisión por grupo (edad, ocupación, vacunado)"""
+    age = np.asarray(AGE_RISK) / np.mean(AGE_RISK)
+    vaccinated = np.asarray(VACCINATED_RISK) / VACCINATED_RISK[0]
+    occupation = (np.asarray(OCCUPATION_RISK) / np.mean(OCCUPATION_RISK)
+                  if n_occupations > 1 else np.ones(1))
+    susceptibility = (age[:, None, None] * vaccinated[None, None, :]).repeat(n_occupations, axis=1)
+    contacts = np.broadcast_to(occupation[None, :, None], susceptibility.shape)
+    transmission = np.broadcast_to(np.array([1.0, VACCINATED_TRANSMISSION])[None, None, :], susceptibility.shape)
+    return susceptibility.ravel(), contacts.ravel(), transmission.ravel()
+
+
+def agent_groups(table):
+    """Grupo de cada agente (índice en edad x ocupación x vacunación) y cantidad de grupos.
+
+    Los agentes sin ocupación (datos continuos) comparten una sola.
+    """
+    n_occupations = len(OCCUPATIONS) if 'occupation' in table['codes'] else 1
+    group = table['codes']['age'].astype(np.int8) * np.int8(n_occupations)
+    if n_occupations > 1:
+        group += table['codes']['occupation']
+    group = group * np.int8(2) + agent_table.flag(table, 'vaccinated').view(np.int8)
+    return group, len(AGE_GROUPS) * n_occupations * 2
+
+
+def _draw_durations(rng, mean, size):
+    """Duraciones en días (geométricas, al menos 1, con media `mean`)"""
+    return rng.geometric(1.0 / mean, size)
+
+
+def simulate(agents, n_days=100, r0=R0, latent_days=LATENT_DAYS, infectious_days=INFECTIOUS_DAYS,
+             initial_infected=INITIAL_INFECTED, seed=42):
+    """Corre la epidemia sobre los agentes día por día.
+
+    agents: tabla compacta (ver agents.py) o columnas de generate_agents.
+    Devuelve un dataset como el discreto de load_data: timestamps (días),
+    infections (contagios nuevos por día) y agents (la misma tabla con
+    'infected' = se contagió en algún momento), más compartments
+    ({'S','E','I','R'}: agentes por día al final de cada día).
+    """
+    table = agents if 'codes' in agents else agent_table.pack(agents)
+    rng = np.random.default_rng(seed)
+    n = table['n']
+
+    group, n_groups = agent_groups(table)
+    susceptibility, contacts, transmission = _modifiers(n_groups // (2 * len(AGE_GROUPS)))
+    sizes = np.bincount(group, minlength=n_groups)
+
+    # Orden de contagio: agentes agrupados, al azar dentro de cada grupo
+    index_dtype = np.int32 if n < 2 ** 31 else np.int64
+    order = rng.permutation(n).astype(index_dtype)
+    order = order[np.argsort(group[order], kind='stable')]
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+    taken = np.zeros(n_groups, dtype=np.int64)
+
+    # Con mezcla proporcional la matriz de próxima generación tiene rango 1 y
+    # su radio espectral (R0) es beta * D * sum(s c^2 t N) / sum(c N)
+    mixing_total = (contacts * sizes).sum()
+    beta = r0 * mixing_total / (infectious_days * (susceptibility * contacts ** 2 * transmission * sizes).sum())
+
+    # Agenda de transiciones por (día, grupo); el último día junta las que
+    # caen fuera de la simulación
+    onsets = np.zeros((n_days + 1, n_groups), dtype=np.int64)
+    recoveries = np.zeros((n_days + 1, n_groups), dtype=np.int64)
+    exposed = np.zeros(n_groups, dtype=np.int64)
+    infectious = np.zeros(n_groups, dtype=np.int64)
+    recovered = np.zeros(n_groups, dtype=np.int64)
+
+    def infect(day, new):
+        """Contagia new[g] agentes de cada grupo y agenda sus transiciones"""
+        total = int(new.sum())
+        if total == 0:
+            return
+        new_group = np.repeat(np.arange(n_groups), new)
+        onset = np.minimum(day + _draw_durations(rng, latent_days, total), n_days)
+        recovery = np.minimum(onset + _draw_durations(rng, infectious_days, total), n_days)
+        np.add.at(onsets, (onset, new_group), 1)
+        np.add.at(recoveries, (recovery, new_group), 1)
+        exposed[:] += new
+        taken[:] += new
+
+    daily = np.zeros(n_days, dtype=np.int64)
+    compartments = np.zeros((n_days, len(COMPARTMENTS)), dtype=np.int64)
+    seeds = rng.multivariate_hypergeometric(sizes, min(initial_infected, n))
+    infect(0, seeds)
+    daily[0] = seeds.sum()
+
+    for day in range(n_days):
+        exposed -= onsets[day]
+        infectious += onsets[day] - recoveries[day]
+        recovered += recoveries[day]
+
+        if day > 0:
+            # Presión de contagio: prevalencia ponderada por contactos y transmisión
+            pressure = (contacts * transmission * infectious).sum() / mixing_total
+            probability = -np.expm1(-beta * susceptibility * contacts * pressure)
+            new = rng.binomial(sizes - taken, probability)
+            infect(day, new)
+            daily[day] = new.sum()
+        compartments[day] = (n - taken.sum(), exposed.sum(), infectious.sum(), recovered.sum())
+
+    # Infectados: el prefijo ya tomado del orden de cada grupo
+    infected = np.zeros(n, dtype=bool)
+    for g in np.flatnonzero(taken):
+        infected[order[starts[g]:starts[g] + taken[g]]] = True
+
+    result = dict(table, flags=dict(table['flags'], infected=np.packbits(infected)))
+    return Dataset(timestamps=np.arange(n_days), infections=daily, agents=result,
+                   compartments={name: compartments[:, k] for k, name in enumerate(COMPARTMENTS)})
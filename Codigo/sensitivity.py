@@ -0,0 +1,96 @@
+"""Sensibilidad de las decisiones a los umbrales fijos de parte_2 y parte_4.
+
+Los umbrales de altura de pico (50), de infección pequeña (20) y los cortes
+de las ventanas (50/100/150) deciden solos cosas como "hay transmisión baja
+entre picos" o "posible artefacto". Esta curva umbral-respuesta muestra
+cuánto depende la decisión del número elegido.
+
+Todas las respuestas son conteos de valores por encima o por debajo del
+umbral. Por eso basta ordenar una vez las muestras, las alturas de los
+picos candidatos y las sumas de cada ventana. Después cada umbral es una
+búsqueda binaria (searchsorted), y miles de umbrales cuestan
+O((n + T) log n), no O(n * T).
+"""
+import numpy as np
+
+from memo import memoized
+from peaks import detect_peaks, to_samples
+from windows import window_sweep, windowed
+
+
+N_THRESHOLDS = 1000
+PEAK_PROMINENCE = 20  # La de find_peaks en parte_2
+PEAK_SEPARATION = 1.0  # Separación y ancho mínimos de find_peaks, en días
+PEAK_WIDTH = 0.25
+SMALL_FRACTION = 0.3  # Fracción de muestras pequeñas para "transmisión baja" (parte_2)
+ARTEFACT_PEAKS = 3  # Muestras sobre el umbral para "posible artefacto" (parte_4)
+
+
+def _above(ordered, thresholds):
+    """Cuántos valores de `ordered` (ordenado) son estrictamente mayores que cada umbral"""
+    return len(ordered) - np.searchsorted(ordered, thresholds, side='right')
+
+
+@memoized
+def threshold_response(infections, thresholds=None, n_thresholds=N_THRESHOLDS, prominence=PEAK_PROMINENCE,
+                       max_width=3, small_fraction=SMALL_FRACTION, artefact_peaks=ARTEFACT_PEAKS, times=None):
+    """Respuesta de los criterios de parte_2 y parte_4 a cada umbral.
+
+    thresholds: umbrales a evaluar (por defecto n_thresholds entre 0 y el
+        máximo de la serie).
+    times: timestamps de la serie, para la separación y el ancho mínimos
+        de los picos (como find_peaks).
+
+    Devuelve un dict con arrays de largo T (uno por umbral):
+        thresholds.
+        peaks: picos de find_peaks(threshold=t, times=times) (con la
+            prominencia dada).
+        samples_above: muestras > t (los "picos" de la ventana original).
+        window_peaks: (max_width, T) ventanas de w días con suma > t * w
+            (fase 0, como test_temporal_windows).
+        small_fraction: fracción de muestras < t (umbral de infección pequeña).
+        small_transmission: small_fraction > small_fraction (parte_2).
+        artefact: samples_above >= artefact_peaks (parte_4).
+    """
+    x = np.asarray(infections, dtype=float)
+    if thresholds is None:
+        thresholds = np.linspace(0, x.max() if len(x) else 1.0, n_thresholds)
+    thresholds = np.asarray(thresholds, dtype=float)
+    ordered = np.sort(x)
+
+    # Sin umbral de altura los filtros de find_peaks no dependen de él: los
+    # picos con umbral t son los candidatos más altos que t. La distancia
+    # también: un pico sobrevive según los más altos que él, que superan t
+    # (salvo empates de altura a menos de la distancia, que scipy resuelve
+    # en un orden arbitrario; con la grilla diaria la distancia no actúa)
+    candidates, _ = detect_peaks(x, prominence=prominence, distance=to_samples(times, PEAK_SEPARATION),
+                                 width=to_samples(times, PEAK_WIDTH), edges=True)
+    peaks = _above(np.sort(x[candidates]), thresholds)
+
+    sweep = window_sweep(x, max_width)
+    window_peaks = np.empty((max_width, len(thresholds)), dtype=np.intp)
+    for width in sweep['widths']:
+        window_peaks[width - 1] = _above(np.sort(windowed(sweep, width)), thresholds * width)
+
+    samples_above = _above(ordered, thresholds)
+    small = np.searchsorted(ordered, thresholds, side='left') / max(len(x), 1)
+    return {
+        'thresholds': thresholds,
+        'peaks': peaks,
+        'samples_above': samples_above,
+        'window_peaks': window_peaks,
+        'small_fraction': small,
+        'small_transmission': small > small_fraction,
+        'artefact': samples_above >= artefact_peaks,
+    }
+
+
+def switch_points(response, key):
+    """Umbrales donde cambia la decisión booleana `key` de una respuesta"""
+    verdict = np.asarray(response[key])
+    return response['thresholds'][1:][verdict[1:] != verdict[:-1]]
+
+
+def agreement(response, key, decision):
+    """Fracción de los umbrales evaluados que llevan a la misma decisión"""
+    return float(np.mean(np.asarray(response[key]) == decision))
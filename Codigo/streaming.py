@@ -0,0 +1,408 @@
+"""Análisis incremental de una serie de infecciones que llega por trozos.
+
+IncrementalAnalyzer recibe muestras a medida que la simulación las produce
+y mantiene, con costo O(1) amortizado por muestra y memoria acotada:
+
+- estadísticas acumuladas (media y varianza de Welford/Chan, mínimo, máximo),
+- fracción de infecciones pequeñas y conteo sobre el umbral de pico,
+- picos en línea con los filtros de find_peaks de parte_2: prominencia
+  mínima y, si update recibe los timestamps, separación y ancho mínimos en
+  días,
+- sumas por ventanas de 1..max_width muestras (como window_sweep, fase 0)
+  y una media móvil sobre las últimas `rolling` muestras.
+
+Cada trozo se procesa con operaciones de NumPy. La detección de picos solo
+recorre los extremos locales del trozo. De los picos y las ventanas se
+guardan únicamente los últimos `history`.
+
+Con timestamps, un pico con la prominencia pedida queda en espera hasta
+tener `context` días de serie a cada lado. Ahí se mide su ancho (como
+scipy, a media prominencia) sobre las muestras de esa ventana, que es lo
+único que se guarda de la serie. Los que pasan se agrupan mientras estén a
+menos de `separation` días entre sí, y de cada grupo quedan los más altos,
+como el filtro de distancia de find_peaks. Dentro de la ventana la
+prominencia nunca es mayor que en la serie completa, así que un pico
+aceptado también lo es para find_peaks. Uno rechazado podría no serlo si
+sus bases quedan a más de `context` días. A diferencia de find_peaks, la
+distancia se aplica después de la prominencia: un máximo más alto pero sin
+prominencia no elimina a un pico cercano.
+"""
+from collections import deque
+
+import numpy as np
+from scipy import signal
+
+
+# Mismos umbrales que parte_2 y parte_4
+PEAK_THRESHOLD = 50
+PEAK_PROMINENCE = 20
+PEAK_SEPARATION = 1.0  # Separación y ancho mínimos de find_peaks, en días
+PEAK_WIDTH = 0.25
+PEAK_CONTEXT = 1.0  # Días de serie a cada lado para medir el ancho de un pico
+SMALL_THRESHOLD = 20
+SMALL_FRACTION = 0.3  # analyze_between_peaks: transmisión pequeña si > 30%
+MAX_WIDTH = 3
+ROLLING = 7
+HISTORY = 1000
+
+
+def _turning_points(prev, chunk):
+    """Índices del trozo que no están dentro de un tramo estrictamente monótono.
+
+    Con prev (la última muestra del trozo anterior, o None) la pendiente de
+    la primera muestra es conocida. La última muestra siempre se incluye.
+    """
+    n = len(chunk)
+    if n < 3:
+        return np.arange(n)
+    slope = np.sign(np.diff(chunk))
+    inner = (slope[:-1] == slope[1:]) & (slope[1:] != 0)
+    keep = np.concatenate(([True], ~inner, [True]))
+    if prev is not None:
+        first = np.sign(chunk[0] - prev)
+        keep[0] = not (first != 0 and first == slope[0])
+    return np.flatnonzero(keep)
+
+
+class IncrementalAnalyzer:
+    """Estado del análisis de una serie que se va recibiendo por trozos.
+
+    update(infections, times) agrega un trozo y devuelve los picos
+    confirmados en él; snapshot() resume el estado actual; finish() cierra
+    la serie (el último máximo cuenta como pico, como edges=True en
+    find_peaks). separation y width (en días) solo se aplican si update
+    recibe los timestamps, como find_peaks(times=...).
+    """
+
+    def __init__(self, threshold=PEAK_THRESHOLD, prominence=PEAK_PROMINENCE, small_threshold=SMALL_THRESHOLD,
+                 max_width=MAX_WIDTH, rolling=ROLLING, history=HISTORY, separation=PEAK_SEPARATION,
+                 width=PEAK_WIDTH, context=PEAK_CONTEXT):
+        self.threshold = threshold
+        self.prominence = prominence
+        self.separation = separation
+        self.width = width
+        self.context = context
+        self.small_threshold = small_threshold
+        self.max_width = max_width
+
+        # Estadísticas acumuladas
+        self.count = 0
+        self.total = 0.0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.n_small = 0
+        self.n_above = 0
+        self._sum_below = 0.0
+        self._last_value = None
+
+        # Picos por histéresis: se busca un máximo ('rise') hasta que la serie
+        # baja `prominence`, y luego un mínimo ('fall') hasta que sube otro
+        # tanto. El valle inicial es el borde, que find_peaks (edges=True)
+        # rellena con el mínimo de la serie - 1: mientras no haya otro valle
+        # vale -inf, y en finish se usa self.min - 1.
+        self._rising = True
+        self._valley = -np.inf
+        self._candidate = None  # (valor, [(índice inicial, índice final, tiempos) por meseta])
+        self.n_peaks = 0
+        self.peaks = deque(maxlen=history)  # (índice, tiempo, valor)
+        self._interval_n = 0
+        self._interval_mean = 0.0
+        self._interval_m2 = 0.0
+
+        # Separación y ancho (solo con timestamps): paso de la serie en días
+        # (el mediano de las primeras muestras, como peaks.to_samples), muestras de
+        # la ventana de contexto, picos por medir y grupo por separar
+        self._timed = None
+        self._step = None
+        self._buffer_t = np.empty(0)
+        self._buffer_x = np.empty(0)
+        self._buffer_start = 0  # Índice de la primera muestra guardada
+        self._unmeasured = deque()  # (índice, tiempo, valor)
+        self._group = []
+
+        # Ventanas consecutivas de w muestras desde la primera
+        self._partial = np.zeros(max_width)
+        self._filled = np.zeros(max_width, dtype=np.int64)
+        self.n_windows = np.zeros(max_width, dtype=np.int64)
+        self.window_peaks = np.zeros(max_width, dtype=np.int64)
+        self.windows = [deque(maxlen=history) for _ in range(max_width)]
+
+        # Media móvil: buffer circular de las últimas `rolling` muestras
+        self._ring = np.zeros(rolling)
+        self._ring_pos = 0
+        self._ring_sum = 0.0
+
+    def update(self, infections, times=None):
+        """Agrega un trozo de muestras; devuelve los picos confirmados en él"""
+        x = np.asarray(infections, dtype=float)
+        if len(x) == 0:
+            return []
+        start = self.count
+        if self._timed is None:
+            self._timed = times is not None
+        t = np.arange(start, start + len(x), dtype=float) if times is None else np.asarray(times, dtype=float)
+
+        self._update_stats(x)
+        self._update_windows(x)
+        self._update_rolling(x)
+        candidates = self._update_peaks(x, t, start)
+        self._last_value = x[-1]
+        if not self._timed:
+            return self._accept(candidates)
+        self._buffer_t = np.concatenate((self._buffer_t, t))
+        self._buffer_x = np.concatenate((self._buffer_x, x))
+        if self._step is None and len(self._buffer_t) > 1:
+            self._step = float(np.median(np.diff(self._buffer_t)))
+        self._unmeasured.extend(candidates)
+        new_peaks = self._resolve(t[-1])
+        self._trim(t[-1])
+        return new_peaks
+
+    def _update_stats(self, x):
+        n = len(x)
+        mean = x.mean()
+        m2 = float(((x - mean) ** 2).sum())
+        # Combinación de Chan de (count, mean, m2) con los del trozo
+        delta = mean - self.mean
+        total = self.count + n
+        self._m2 += m2 + delta ** 2 * self.count * n / total
+        self.mean += delta * n / total
+        self.count = total
+        self.total += float(x.sum())
+        self.min = min(self.min, float(x.min()))
+        self.max = max(self.max, float(x.max()))
+        self.n_small += int(np.count_nonzero(x < self.small_threshold))
+        below = x <= self.threshold
+        self.n_above += int(n - np.count_nonzero(below))
+        self._sum_below += float(x[below].sum())
+
+    def _update_windows(self, x):
+        cumulative = np.concatenate(([0.0], np.cumsum(x)))
+        n = len(x)
+        for w in range(1, self.max_width + 1):
+            i = w - 1
+            # Posiciones de cumulative donde se completa una ventana
+            ends = np.arange(w - self._filled[i], n + 1, w)
+            if len(ends):
+                sums = cumulative[ends] - cumulative[np.maximum(ends - w, 0)]
+                sums[0] += self._partial[i]
+                self.n_windows[i] += len(sums)
+                self.window_peaks[i] += int(np.count_nonzero(sums > self.threshold * w))
+                self.windows[i].extend(sums[-self.windows[i].maxlen:].tolist())
+                self._partial[i] = cumulative[n] - cumulative[ends[-1]]
+            else:
+                self._partial[i] += cumulative[n]
+            self._filled[i] = (self._filled[i] + n) % w
+
+    def _update_rolling(self, x):
+        size = len(self._ring)
+        if size == 0:
+            return
+        x = x[-size:]
+        slots = (self._ring_pos + np.arange(len(x))) % size
+        self._ring_sum += float(x.sum() - self._ring[slots].sum())
+        self._ring[slots] = x
+        self._ring_pos = (self._ring_pos + len(x)) % size
+
+    def _confirm(self, found):
+        value, plateaus = self._candidate
+        if value <= self.threshold:
+            return
+        # Máximos de igual altura sin uno mayor entre ellos se confirman
+        # juntos; en una meseta cuenta el punto medio, como find_peaks
+        for first, last, t_first, t_last in plateaus:
+            index = (first + last) // 2
+            time = t_first if index == first else (t_last if index == last else t_first + (t_last - t_first) / 2)
+            found.append((index, time, value))
+
+    def _accept(self, peaks):
+        """Cuenta los picos que pasaron todos los filtros"""
+        for peak in peaks:
+            time = peak[1]
+            if self.peaks:
+                interval = time - self.peaks[-1][1]
+                self._interval_n += 1
+                delta = interval - self._interval_mean
+                self._interval_mean += delta / self._interval_n
+                self._interval_m2 += delta * (interval - self._interval_mean)
+            self.n_peaks += 1
+            self.peaks.append(peak)
+        return list(peaks)
+
+    def _wide_enough(self, peak, final):
+        """Ancho del pico a media prominencia, sobre la ventana de contexto"""
+        if self._step is None or not self.width:
+            return True
+        index, time, _ = peak
+        t, x = self._buffer_t, self._buffer_x
+        at = index - self._buffer_start
+        # La ventana cubre al menos la meseta entera (si no, no hay pico)
+        below = np.flatnonzero(x[:at] < x[at])
+        lo = min(np.searchsorted(t, time - self.context), below[-1] if len(below) else 0)
+        below = np.flatnonzero(x[at:] < x[at])
+        hi = max(np.searchsorted(t, time + self.context, side='right'), at + below[0] + 1 if len(below) else len(x))
+        window = x[lo:hi]
+        position = at - lo
+        # Bordes reales de la serie: el relleno de find_peaks (mínimo - 1)
+        low = self.min - 1
+        if self._buffer_start + lo == 0:
+            window = np.concatenate(([low], window))
+            position += 1
+        if final and hi == len(x):
+            window = np.concatenate((window, [low]))
+        width = signal.peak_widths(window, [position], rel_height=0.5)[0][0]
+        return width >= self.width / self._step
+
+    def _distance(self):
+        """Separación mínima en muestras (como to_samples en find_peaks)"""
+        if self._step is None or not self.separation:
+            return 1
+        distance = self.separation / self._step
+        return int(np.ceil(distance)) if distance > 1 else 1
+
+    def _separate(self, group):
+        """Los picos del grupo que sobreviven al filtro de distancia (del más alto al más bajo)"""
+        distance = self._distance()
+        kept = []
+        # En empates de altura va primero el de más a la derecha, como scipy
+        for peak in sorted(group, key=lambda p: (p[2], p[0]), reverse=True):
+            if all(abs(peak[0] - other[0]) >= distance for other in kept):
+                kept.append(peak)
+        return sorted(kept)
+
+    def _resolve(self, now, final=False):
+        """Mide los picos con contexto suficiente y cierra los grupos completos"""
+        found = []
+        distance = self._distance()
+        while self._unmeasured and (final or self._unmeasured[0][1] + self.context <= now):
+            peak = self._unmeasured.popleft()
+            if not self._wide_enough(peak, final):
+                continue
+            if self._group and peak[0] - self._group[-1][0] >= distance:
+                found += self._accept(self._separate(self._group))
+                self._group = []
+            self._group.append(peak)
+        if self._group:
+            # El grupo sigue abierto si todavía puede llegar un pico cercano
+            last = self._group[-1][0] + distance
+            pending = self._unmeasured[0][0] if self._unmeasured else None
+            if self._rising and self._candidate is not None:
+                first = self._candidate[1][0][0]
+                pending = first if pending is None else min(pending, first)
+            if final or (self.count >= last and (pending is None or pending >= last)):
+                found += self._accept(self._separate(self._group))
+                self._group = []
+        return found
+
+    def _trim(self, now):
+        """Descarta las muestras que ya no hacen falta para medir anchos"""
+        keep_from = now
+        if self._unmeasured:
+            keep_from = min(keep_from, self._unmeasured[0][1])
+        if self._rising and self._candidate is not None:
+            keep_from = min(keep_from, self._candidate[1][0][2])
+        drop = int(np.searchsorted(self._buffer_t, keep_from - self.context))
+        if drop:
+            self._buffer_t = self._buffer_t[drop:]
+            self._buffer_x = self._buffer_x[drop:]
+            self._buffer_start += drop
+
+    def _update_peaks(self, x, t, start):
+        found = []
+        index = _turning_points(self._last_value, x)
+        values = x[index].tolist()
+        times = t[index].tolist()
+        prominence = self.prominence
+        for i, value, time in zip((index + start).tolist(), values, times):
+            if self._rising:
+                candidate = self._candidate
+                if candidate is None or value > candidate[0]:
+                    self._candidate = (value, [(i, i, time, time)])
+                elif value == candidate[0]:
+                    plateaus = candidate[1]
+                    if plateaus[-1][1] == i - 1:
+                        plateaus[-1] = (plateaus[-1][0], i, plateaus[-1][2], time)
+                    else:
+                        plateaus.append((i, i, time, time))
+                elif value <= candidate[0] - prominence:
+                    self._confirm(found)
+                    self._rising = False
+                    self._valley = value
+            elif value < self._valley:
+                self._valley = value
+            elif value >= self._valley + prominence:
+                self._rising = True
+                self._candidate = (value, [(i, i, time, time)])
+        return found
+
+    def finish(self):
+        """Cierra la serie: el máximo pendiente cuenta como pico (borde final).
+
+        El borde final también vale self.min - 1, así que la prominencia
+        del máximo pendiente se mide desde el valle a su izquierda (o desde
+        el borde inicial, si no hubo ninguno).
+        """
+        found = []
+        if self._rising and self._candidate is not None:
+            if self._candidate[0] - max(self._valley, self.min - 1) >= self.prominence:
+                self._confirm(found)
+            self._candidate = None
+        if not self._timed:
+            return self._accept(found)
+        self._unmeasured.extend(found)
+        return self._resolve(np.inf, final=True)
+
+    def pending_peak(self):
+        """Máximo actual que todavía no se confirmó (o no se midió ni separó)"""
+        if not self._rising or self._candidate is None or self._candidate[0] <= self.threshold:
+            waiting = list(self._unmeasured) or self._group
+            return waiting[-1] if waiting else None
+        value, plateaus = self._candidate
+        first, last, t_first, _ = plateaus[0]
+        return (first + last) // 2, t_first, value
+
+    def snapshot(self):
+        """Resumen del estado actual (lo que imprimen parte_2 y parte_4)"""
+        n = self.count
+        variance = self._m2 / n if n else float('nan')
+        small_fraction = self.n_small / n if n else float('nan')
+        n_below = n - self.n_above
+        filled = min(n, len(self._ring))
+        return {
+            'n_samples': n,
+            'total': self.total,
+            'mean': self.mean if n else float('nan'),
+            'std': float(np.sqrt(variance)),
+            'min': self.min,
+            'max': self.max,
+            'small_fraction': small_fraction,
+            'small_transmission': small_fraction > SMALL_FRACTION,
+            'above_threshold': self.n_above,
+            'mean_below_threshold': self._sum_below / n_below if n_below else float('nan'),
+            'pattern': 'artificial' if self.n_above >= 3 else 'natural',
+            'n_peaks': self.n_peaks,
+            'recent_peaks': list(self.peaks),
+            'pending_peak': self.pending_peak(),
+            'peak_interval_mean': self._interval_mean if self._interval_n else float('nan'),
+            'peak_interval_std': (float(np.sqrt(self._interval_m2 / self._interval_n))
+                                  if self._interval_n else float('nan')),
+            'windows': {w: {'n_windows': int(self.n_windows[w - 1]),
+                            'peak_count': int(self.window_peaks[w - 1]),
+                            'recent': list(self.windows[w - 1])}
+                        for w in range(1, self.max_width + 1)},
+            'rolling_mean': self._ring_sum / filled if filled else float('nan'),
+        }
+
+
+def analyze_chunks(chunks, **kwargs):
+    """Corre el análisis sobre un iterable de (timestamps, infecciones).
+
+    Por ejemplo load_data.iter_series_chunks(...). Devuelve el snapshot final.
+    """
+    analyzer = IncrementalAnalyzer(**kwargs)
+    for times, infections in chunks:
+        analyzer.update(infections, times)
+    analyzer.finish()
+    return analyzer.snapshot()
@@ -0,0 +1,51 @@
+"""Reagregación temporal en ventanas de cualquier ancho y fase.
+
+Todas las sumas por ventana salen de una sola suma acumulada: la ventana
+[i, i + w) suma c[i + w] - c[i]. Cada ancho 1..W se evalúa en todas sus
+fases con una pasada vectorizada, y de cada uno se guardan solo los conteos
+por fase: la memoria es O(n + W^2), no O(n * W).
+"""
+import numpy as np
+
+from memo import memoized
+
+
+@memoized
+def window_sweep(infections, max_width, threshold=50):
+    """Picos para cada ancho de ventana 1..max_width y cada fase.
+
+    Un pico en una ventana de w días es una suma mayor que threshold * w (el
+    umbral diario escalado al ancho, como 50/100/150 en parte_4). La fase
+    de la ventana que empieza en i es i % w.
+
+    Devuelve un dict con:
+        widths: anchos 1..W.
+        cumulative: suma acumulada de la serie (n + 1), de donde windowed
+            saca las sumas de cualquier ancho y fase.
+        peak_counts: (W, W) picos por ancho y fase (-1 si fase >= ancho).
+        n_windows: (W, W) ventanas completas por ancho y fase.
+    """
+    x = np.asarray(infections, dtype=float)
+    n = len(x)
+    cumulative = np.concatenate(([0.0], np.cumsum(x)))
+    widths = np.arange(1, max_width + 1)
+
+    # Un ancho por vez: solo hay en memoria las n - w + 1 sumas de ese ancho
+    W = len(widths)
+    peak_counts = np.full((W, W), -1, dtype=np.intp)
+    n_windows = np.full((W, W), -1, dtype=np.intp)
+    for w in widths:
+        phases = np.arange(w)
+        starts = max(n - w + 1, 0)
+        n_windows[w - 1, :w] = np.maximum((starts - phases + w - 1) // w, 0)
+        sums = cumulative[w:] - cumulative[:n + 1 - w] if starts else np.empty(0)
+        peak_counts[w - 1, :w] = np.bincount(np.flatnonzero(sums > threshold * w) % w, minlength=w)
+
+    return {'widths': widths, 'cumulative': cumulative, 'peak_counts': peak_counts, 'n_windows': n_windows}
+
+
+def windowed(sweep, width, phase=0):
+    """Serie reagregada en ventanas completas de `width` días desde `phase`"""
+    cumulative = sweep['cumulative']
+    ends = cumulative[phase + width::width]
+    return ends - cumulative[phase:phase + width * len(ends):width]
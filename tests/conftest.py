@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de Codigo se importan entre sí por nombre (se corren desde ahí)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'Codigo'))
@@ -0,0 +1,23 @@
+import numpy as np
+
+import agents as agent_table
+from agent_store import create, iter_chunks, open_store, save, value_counts
+from load_data import generate_agents
+
+
+def _schema(table):
+    return {group: {name: values.dtype for name, values in table[group].items()}
+            for group in ('codes', 'flags', 'values')}
+
+
+def test_empty_store_round_trip(tmp_path):
+    for kind in ('discrete', 'continuous'):
+        expected = agent_table.pack(generate_agents(0, kind))
+        created = create(tmp_path / f'created_{kind}', 0, kind)
+        saved = save(expected, tmp_path / f'saved_{kind}')
+        for table in (created, saved, open_store(tmp_path / f'created_{kind}')):
+            assert table['n'] == 0
+            assert _schema(table) == _schema(expected)
+            assert list(iter_chunks(table)) == []
+            assert value_counts(table, 'age').sum() == 0
+            assert np.array_equal(value_counts(table, 'vaccinated').to_numpy(), [0, 0])
@@ -0,0 +1,30 @@
+import numpy as np
+
+import agents as agent_table
+from agent_store import iter_chunks
+from approx import approximate, relative_risk_intervals
+from load_data import generate_agents
+from rates import attack_rates, relative_risks
+
+
+def test_relative_risk_bounds_cover_full_data_rr():
+    # Cada intervalo es al 95%: sobre varias muestras casi todos contienen el RR de la población
+    table = agent_table.pack(generate_agents(200_000, 'discrete'))
+    full = attack_rates(iter_chunks(table))
+    covered = []
+    for seed in range(40):
+        for trait, group in relative_risk_intervals(approximate(table, target_error=0.01, seed=seed)).items():
+            exact = relative_risks(full, trait, group['reference'])
+            low, high = group['katz'].T
+            covered += ((low <= exact) & (exact <= high)).tolist()
+    assert np.mean(covered) >= 0.9
+
+
+def test_relative_risk_bounds_collapse_on_whole_population():
+    # Sin muestreo (fpc = 0) el intervalo es el RR exacto
+    table = agent_table.pack(generate_agents(20_000, 'discrete'))
+    full = attack_rates(iter_chunks(table))
+    intervals = relative_risk_intervals(approximate(table, n_sample=table['n']))
+    for trait, group in intervals.items():
+        exact = relative_risks(full, trait, group['reference'])
+        np.testing.assert_allclose(group['katz'], np.stack((exact, exact), axis=-1))
@@ -0,0 +1,52 @@
+import numpy as np
+from scipy import signal
+
+from peaks import detect_peaks
+
+
+def _series(rng):
+    n = int(rng.integers(1, 200))
+    # Valores enteros para que haya mesetas y empates de altura
+    return rng.integers(0, 12, n).astype(float) * rng.choice([1, 10])
+
+
+def test_matches_scipy_on_random_series():
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        x = _series(rng)
+        height = float(rng.integers(0, 100))
+        distance = int(rng.integers(1, 8))
+        prominence = float(rng.integers(0, 30))
+        peaks, props = detect_peaks(x, height=height, distance=distance, prominence=prominence, width=1)
+        expected, _ = signal.find_peaks(x, height=(height + 1e-9), distance=distance,
+                                        prominence=prominence, width=1)
+        np.testing.assert_array_equal(peaks, expected)
+        np.testing.assert_array_equal(props['peak_heights'], x[expected])
+
+
+def test_height_is_strict():
+    x = np.array([0, 50, 0, 51, 0], dtype=float)
+    peaks, _ = detect_peaks(x, height=50)
+    assert peaks.tolist() == [3]
+
+
+def test_edges_allow_first_and_last_sample():
+    x = np.array([80, 10, 60, 10, 90], dtype=float)
+    assert detect_peaks(x, height=50)[0].tolist() == [2]
+    peaks, props = detect_peaks(x, height=50, prominence=20, edges=True)
+    assert peaks.tolist() == [0, 2, 4]
+    assert props['prominences'].tolist() == [70, 50, 81]
+    assert props['left_bases'].min() >= 0 and props['right_bases'].max() <= len(x) - 1
+
+
+def test_find_peaks_spacing_is_in_time_units():
+    from load_data import generate_series
+    from parte_2 import find_peaks
+
+    # Con cientos de muestras por día el ruido supera la prominencia sola
+    times, infections = generate_series(300_000)
+    assert len(find_peaks(infections)) > 3
+    assert len(find_peaks(infections, times=times)) == 3
+    # Serie diaria: un día es una muestra, la separación no descarta nada
+    daily = [10, 12, 8, 9, 11, 15, 120, 9, 11, 7, 8, 10, 125]
+    assert find_peaks(daily, times=list(range(len(daily)))) == [6, 12]
@@ -0,0 +1,19 @@
+import instrument
+import pipeline
+from load_data import load_data
+
+
+def test_forked_stages_do_not_duplicate_parent_events():
+    instrument.enable()
+    try:
+        instrument.collect()
+        data = load_data(cache=False)
+        pipeline.run_stages(['parte_1', 'parte_2'], data=data, workers=2)
+        calls = instrument.summary()
+    finally:
+        instrument.disable()
+        instrument.collect()
+    # load_data corrió una vez en el padre; cada hijo hereda ese evento
+    assert calls['load_data.load_data']['calls'] == 1
+    assert calls['parte_1.run']['calls'] == 1
+    assert calls['parte_2.run']['calls'] == 1
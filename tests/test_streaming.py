@@ -0,0 +1,56 @@
+import numpy as np
+
+from parte_2 import find_peaks
+from streaming import IncrementalAnalyzer, analyze_chunks
+
+
+def _streamed_peaks(x, cuts):
+    analyzer = IncrementalAnalyzer()
+    for chunk in np.split(x, cuts):
+        analyzer.update(chunk)
+    analyzer.finish()
+    return [index for index, _, _ in analyzer.peaks]
+
+
+def test_matches_find_peaks_on_short_and_random_series():
+    rng = np.random.default_rng(5)
+    for k in range(1000):
+        n = int(rng.integers(1, 60))
+        if k % 2:
+            x = rng.integers(0, 10, n).astype(float) * 12  # mesetas y empates
+        else:
+            x = np.cumsum(rng.normal(0, 15, n)) + 60
+        cuts = np.sort(rng.integers(0, n + 1, int(rng.integers(0, 4))))
+        assert _streamed_peaks(x, cuts) == find_peaks(x), x.tolist()
+
+
+def test_edge_prominence_is_measured_from_padding():
+    # Un solo valor o una subida corta: el borde vale min - 1, no -inf
+    assert _streamed_peaks(np.array([75.0]), []) == find_peaks([75.0]) == []
+    assert _streamed_peaks(np.array([60.0, 75.0]), []) == find_peaks([60.0, 75.0]) == []
+    # La serie termina subiendo: el último valor es pico si sube lo suficiente
+    rising = np.array([10.0, 120.0, 30.0, 40.0, 60.0, 90.0])
+    assert _streamed_peaks(rising, [3]) == find_peaks(rising) == [1, 5]
+
+
+def test_analyze_chunks_counts_same_peaks_as_batch():
+    from load_data import generate_series, iter_series_chunks
+
+    _, infections = generate_series(2000, t_end=10.0)
+    snapshot = analyze_chunks(iter_series_chunks(2000, t_end=10.0, chunk_size=300))
+    assert snapshot['n_peaks'] == len(find_peaks(infections))
+
+
+def test_separation_and_width_in_days_on_dense_series():
+    # Con ~14 000 muestras por día el ruido también tiene la prominencia
+    # mínima; con los timestamps se piden la separación y el ancho en días
+    from load_data import generate_series
+
+    times, infections = generate_series(300_000)
+    analyzer = IncrementalAnalyzer()
+    for start in range(0, len(times), 1 << 14):
+        analyzer.update(infections[start:start + (1 << 14)], times[start:start + (1 << 14)])
+    analyzer.finish()
+    expected = find_peaks(infections, times=times)
+    assert [index for index, _, _ in analyzer.peaks] == expected
+    assert len(expected) == 3